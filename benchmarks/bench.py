@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.pso_algorithm import PSO
+from src.core.recorder import TrajectoryRecorder
+from src.problems import propagation
+from src.problems.problem_pathfinding import PathfindingProblem
+from src.problems.problem_pathfinding_3d import PathfindingProblem3D
+from src.problems.problem_wifi import WifiProblem
+from src.problems.problem_wifi_3d import WifiProblem3D
+from src.problems.registry import build_problem
+
+SWARM = 100
+SEED = 1234
+
+
+class Sphere:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def get_bounds(self):
+        return [(-100, 100)] * self.dim
+
+    def fitness_function(self, position):
+        return float(np.sum(position ** 2))
+
+    def fitness_batch(self, positions):
+        return np.sum(positions ** 2, axis=1)
+
+
+def problem_cases():
+    cases = []
+    for n in (5, 15, 45):
+        cases.append((f"problem/pathfinding_2d/waypoints={n}", lambda n=n: PathfindingProblem((5, 5), (95, 95), n)))
+    for n in (5, 15):
+        cases.append((f"problem/pathfinding_3d/waypoints={n}",
+                      lambda n=n: PathfindingProblem3D((5, 5, 5), (95, 95, 95), n)))
+    for routers in (3, 8, 15):
+        for grid in (50, 100, 300):
+            cases.append((f"problem/wifi_2d/routers={routers}/grid={grid}",
+                          lambda r=routers, g=grid: WifiProblem(n_routers=r, signal_radius=35, grid_resolution=g)))
+    for routers in (3, 8):
+        for grid in (20, 30):
+            cases.append((f"problem/wifi_3d/routers={routers}/grid={grid}",
+                          lambda r=routers, g=grid: WifiProblem3D(n_routers=r, signal_radius=45, grid_resolution=g)))
+    return cases
+
+
+def topology_cases():
+    cases = []
+    for topology in ('global', 'social', 'geographic', 'von_neumann', 'random', 'star'):
+        for n in (50, 200, 1000):
+            cases.append((f"topology/{topology}/particles={n}", topology, n))
+    return cases
+
+
+def endtoend_cases():
+    return [(f"e2e/{name}", name) for name in ('pathfinding_2d', 'pathfinding_3d', 'wifi_2d', 'wifi_3d')]
+
+
+def _measure(fn, repeats):
+    # One untimed warm-up run, then wall time is the median of `repeats` runs; peak memory is
+    # taken from one extra traced run.
+    value = fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(times)), float(min(times)), peak / 2 ** 20, value
+
+
+def bench_problem(factory, repeats, batches):
+    # Construction (grids, wall visibility tables) is timed and traced once, from a cold cache.
+    propagation._lattice_crossings.cache_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    problem = factory()
+    build_seconds = time.perf_counter() - start
+    build_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+
+    bounds = np.array(problem.get_bounds(), dtype=float)
+    rng = np.random.default_rng(SEED)
+    positions = rng.uniform(bounds[:, 0], bounds[:, 1], size=(SWARM, len(bounds)))
+
+    def run():
+        for _ in range(batches):
+            problem.fitness_batch(positions)
+
+    median, best, peak, _ = _measure(run, repeats)
+    return {'seconds': median, 'seconds_min': best, 'evals_per_sec': SWARM * batches / median, 'peak_mb': peak,
+            'build_seconds': build_seconds, 'build_peak_mb': build_peak}
+
+
+def bench_topology(topology, n, repeats, iterations):
+    objective = Sphere(10)
+
+    def run():
+        np.random.seed(SEED)
+        pso = PSO(objective.fitness_function, objective.get_bounds(), n, iterations, topology=topology,
+                  neighbor_size=5, topology_seed=SEED, recorder=TrajectoryRecorder('off'))
+        return pso.optimize()[1]
+
+    median, best, peak, value = _measure(run, repeats)
+    return {'seconds': median, 'seconds_min': best, 'evals_per_sec': n * iterations / median, 'peak_mb': peak,
+            'best_value': float(value)}
+
+
+def bench_endtoend(name, repeats, iterations):
+    problem = build_problem(name, 5)
+
+    def run():
+        np.random.seed(SEED)
+        pso = PSO(problem.fitness_function, problem.get_bounds(), 40, iterations, topology='global',
+                  recorder=TrajectoryRecorder('off'))
+        return pso.optimize()[1]
+
+    median, best, peak, value = _measure(run, repeats)
+    return {'seconds': median, 'seconds_min': best, 'evals_per_sec': 40 * iterations / median, 'peak_mb': peak,
+            'best_value': float(value)}
+
+
+def run_all(pattern=None, quick=False):
+    repeats = 3 if quick else 7
+    batches = 2 if quick else 10
+    iterations = 20 if quick else 100
+
+    jobs = []
+    for name, factory in problem_cases():
+        jobs.append((name, lambda f=factory: bench_problem(f, repeats, batches)))
+    for name, topology, n in topology_cases():
+        jobs.append((name, lambda t=topology, n=n: bench_topology(t, n, repeats, iterations)))
+    for name, problem in endtoend_cases():
+        jobs.append((name, lambda p=problem: bench_endtoend(p, repeats, iterations)))
+
+    results = {}
+    for name, job in jobs:
+        if pattern and pattern not in name:
+            continue
+        results[name] = job()
+        r = results[name]
+        line = f"{name:<45} {r['seconds'] * 1e3:10.2f} ms {r['evals_per_sec']:12.0f} eval/s {r['peak_mb']:8.2f} MB"
+        if 'build_seconds' in r:
+            line += f"  (build {r['build_seconds'] * 1e3:.0f} ms, {r['build_peak_mb']:.1f} MB)"
+        print(line, file=sys.stderr)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'quick': quick,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    # Returns the names whose best-of-N time grew by more than `threshold` (e.g. 0.2 = 20%).
+    # The minimum is compared rather than the median because it is far less sensitive to noise.
+    regressions = []
+    print(f"{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<45} {'-':>10} {result['seconds_min'] * 1e3:9.2f}ms {'new':>7}")
+            continue
+        ratio = result['seconds_min'] / base['seconds_min']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        if 'best_value' in base and base['best_value'] != result.get('best_value'):
+            flag += '  RESULT CHANGED'
+        print(f"{name:<45} {base['seconds_min'] * 1e3:9.2f}ms {result['seconds_min'] * 1e3:9.2f}ms {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PSO core and problem benchmarks (headless, numpy only)")
+    parser.add_argument('--filter', '-k', default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="fewer repeats and iterations")
+    parser.add_argument('--output', '-o', default=None, help="write results as JSON")
+    parser.add_argument('--baseline', '-b', default=None, help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    current = run_all(args.filter, args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,23 @@
 import sys
 import os
-import tkinter as tk
-from tkinter import ttk
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.ui.desktop_app import PSOInterface
-
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Headless mode: `python main.py run ...` / `python main.py sweep ...` never touch Tk.
+        from src.cli import main
+        sys.exit(main())
+
+    import tkinter as tk
+    from tkinter import ttk
+
+    from src.ui.desktop_app import PSOInterface
+
     root = tk.Tk()
 
     style = ttk.Style()
     style.theme_use('clam')
 
     app = PSOInterface(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
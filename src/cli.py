@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core import batch, islands
+from src.core.checkpoint import Checkpointer, load_checkpoint
+from src.core.evaluators import EVALUATOR_BACKENDS, make_evaluator
+from src.core.fitness_cache import FitnessCache
+from src.core.instrumentation import Profiler
+from src.core.pso_algorithm import PSO
+from src.core.multiresolution import ResolutionSchedule
+from src.core.recorder import TrajectoryRecorder, RECORDER_MODES
+from src.core.rng import RNG_KINDS
+from src.core.stopping import build_criteria
+from src.core.topologies import TOPOLOGIES
+from src.problems.registry import PROBLEMS, build_problem
+
+
+def _add_run_parser(subparsers):
+    parser = subparsers.add_parser('run', help="run a single optimization")
+    parser.add_argument('--problem', choices=sorted(PROBLEMS), default='pathfinding_2d')
+    parser.add_argument('--complexity', type=int, default=5, help="waypoints (pathfinding) or routers (Wi-Fi)")
+    parser.add_argument('--scene', default=None, help="scene file (JSON) replacing the built-in geometry")
+    parser.add_argument('--particles', type=int, default=40)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='global')
+    parser.add_argument('--neighbor-size', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rng', choices=RNG_KINDS, default='legacy',
+                        help="random source: seeded global np.random or a PCG64 generator for this run")
+    parser.add_argument('--dtype', choices=batch.DTYPES, default='float64',
+                        help="precision of positions and problem grids (costs stay float64)")
+    parser.add_argument('--record', choices=RECORDER_MODES, default='off',
+                        help="trajectory recording (stored only in npz output)")
+    parser.add_argument('--record-every', type=int, default=1)
+    batch.add_stopping_arguments(parser)
+    parser.add_argument('--resolution-levels', type=int, nargs='+', default=None,
+                        help="coarse-to-fine grid resolutions for the Wi-Fi problems, e.g. 15 30 50")
+    parser.add_argument('--refine-stall', type=int, default=None,
+                        help="refine early after N iterations without improvement at the current level")
+    parser.add_argument('--cache-tol', type=float, default=None,
+                        help="memoize fitness on positions quantized to this tolerance")
+    parser.add_argument('--cache-mb', type=float, default=64)
+    parser.add_argument('--backend', choices=EVALUATOR_BACKENDS, default='serial',
+                        help="where fitness evaluations run (process: persistent worker pool)")
+    parser.add_argument('--workers', type=int, default=None, help="pool size (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=None, help="particles per dispatched task")
+    parser.add_argument('--profile', action='store_true', help="time each phase of the PSO loop")
+    parser.add_argument('--checkpoint', default=None, help="save the swarm state to this file (npz) while running")
+    parser.add_argument('--checkpoint-every', type=int, default=10, help="iterations between checkpoints")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from --checkpoint if it exists (same arguments as the original run)")
+    parser.add_argument('--format', choices=('json', 'npz'), default=None,
+                        help="output format (default: from the output extension, json for stdout)")
+    parser.add_argument('--output', '-o', default=None, help="output file (default: stdout)")
+    return parser
+
+
+def _flatten_into(arrays, key, value):
+    # Nested dicts become key_subkey entries, so the npz loads without pickled object arrays.
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten_into(arrays, f'{key}_{k}', v)
+    elif value is not None:
+        arrays[key] = np.asarray(value)
+
+
+def run(args):
+    rng = None
+    if args.rng == 'pcg64':
+        rng = np.random.default_rng(args.seed)
+    elif args.seed is not None:
+        np.random.seed(args.seed)
+    problem = build_problem(args.problem, args.complexity, scene=args.scene, dtype=args.dtype)
+    recorder = TrajectoryRecorder(args.record, every=args.record_every)
+
+    schedule = None
+    if args.resolution_levels:
+        if not hasattr(problem, 'set_resolution'):
+            raise SystemExit(f"{args.problem} has no adjustable grid resolution")
+        schedule = ResolutionSchedule(problem, args.resolution_levels, stall_window=args.refine_stall)
+
+    evaluator = make_evaluator(problem.fitness_function, args.backend, args.workers, args.chunk_size)
+    objective = evaluator
+    if args.cache_tol is not None:
+        objective = FitnessCache(objective, args.cache_tol, int(args.cache_mb * 1024 * 1024))
+
+    if args.resume and args.checkpoint is None:
+        raise SystemExit("--resume needs --checkpoint")
+    checkpointer = Checkpointer(args.checkpoint, args.checkpoint_every) if args.checkpoint else None
+
+    start = time.perf_counter()
+    with evaluator:
+        pso = PSO(objective, problem.get_bounds(), args.particles, args.iterations,
+                  topology=args.topology, neighbor_size=args.neighbor_size, recorder=recorder,
+                  stopping=build_criteria(**batch.stopping_options(args)), resolution_schedule=schedule,
+                  profiler=Profiler() if args.profile else None, dtype=args.dtype, checkpointer=checkpointer,
+                  rng=rng)
+        resumed = 0.0
+        if args.resume and os.path.exists(args.checkpoint):
+            state = load_checkpoint(args.checkpoint)
+            pso.set_state(state)
+            resumed = state['elapsed']
+            print(f"resuming {args.checkpoint} at iteration {pso.start_iteration}", file=sys.stderr)
+        outcome = pso.optimize()
+    elapsed = time.perf_counter() - start + resumed
+    best_pos, best_val, history, cost_history = outcome
+
+    result = {
+        'problem': args.problem,
+        'complexity': args.complexity,
+        'scene': args.scene,
+        'topology': args.topology,
+        'num_particles': args.particles,
+        'max_iter': args.iterations,
+        'seed': args.seed,
+        'rng': args.rng,
+        'backend': args.backend,
+        'dtype': args.dtype,
+        'elapsed': elapsed,
+        'stop_reason': outcome.stop_reason,
+        'iterations': outcome.iterations,
+        'evaluations': outcome.evaluations,
+        'fitness_cache': objective.stats() if isinstance(objective, FitnessCache) else None,
+        'profile': outcome.profile.as_dict() if outcome.profile is not None else None,
+        'best_value': float(best_val),
+        'best_position': np.asarray(best_pos),
+        'cost_history': np.asarray(cost_history, dtype=float),
+    }
+
+    fmt = args.format
+    if fmt is None:
+        fmt = 'npz' if args.output and args.output.endswith('.npz') else 'json'
+
+    if fmt == 'npz':
+        if args.output is None:
+            raise SystemExit("npz output needs --output")
+        arrays = {}
+        for key, value in result.items():
+            _flatten_into(arrays, key, value)
+        if len(history):
+            arrays['history'] = history.frames[:len(history)]
+            arrays['history_iterations'] = history.iterations[:len(history)]
+        np.savez_compressed(args.output, **arrays)
+    else:
+        text = json.dumps(batch._to_json(result), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text)
+        else:
+            print(text)
+
+    print(f"{args.problem}: best cost {best_val:.4f} in {elapsed:.2f}s, {outcome.iterations} iterations "
+          f"({outcome.stop_reason})", file=sys.stderr)
+    if outcome.profile is not None:
+        print(outcome.profile, file=sys.stderr)
+    if checkpointer is not None and checkpointer.error is not None:
+        print(f"warning: checkpoint not written: {checkpointer.error}", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="Headless PSO runner (no GUI imports)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    _add_run_parser(subparsers).set_defaults(handler=run)
+
+    sweep = subparsers.add_parser('sweep', help="parallel multi-seed parameter sweep")
+    batch.build_parser(sweep).set_defaults(handler=lambda args: batch.main(args=args) or 0)
+
+    island_model = subparsers.add_parser('islands', help="multi-swarm island model with periodic migration")
+    islands.build_parser(island_model).set_defaults(handler=lambda args: islands.main(args=args) or 0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
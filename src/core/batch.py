@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.core.checkpoint import Checkpointer, load_checkpoint
+from src.core.pso_algorithm import PSO
+from src.core.recorder import TrajectoryRecorder
+from src.core.rng import RNG_KINDS
+from src.core.stopping import build_criteria
+from src.core.topologies import TOPOLOGIES
+from src.problems.registry import build_problem
+
+PERCENTILES = (10, 25, 75, 90)
+DTYPES = ('float64', 'float32')
+
+
+def make_grid(problems, topologies, swarm_sizes, iterations, seeds, complexity=5, neighbor_size=5,
+              stopping=None, dtype='float64', scene=None, rng='legacy'):
+    grid = []
+    for problem, topology, n_part, n_iter, seed in itertools.product(problems, topologies, swarm_sizes,
+                                                                      iterations, seeds):
+        grid.append({
+            'problem': problem,
+            'complexity': complexity,
+            'topology': topology,
+            'num_particles': n_part,
+            'max_iter': n_iter,
+            'neighbor_size': neighbor_size,
+            'seed': seed,
+            'stopping': dict(stopping or {}),
+            'dtype': dtype,
+            'scene': scene,
+            'rng': rng,
+        })
+    return grid
+
+
+def checkpoint_name(spec):
+    # Every setting of the run goes into the name, so runs of different sweeps sharing a
+    # checkpoint directory never pick up each other's state.
+    settings = {k: v for k, v in spec.items() if k not in ('checkpoint', 'checkpoint_every')}
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{spec['problem']}_{spec['topology']}_s{spec['seed']}_{digest}.npz"
+
+
+def run_single(spec):
+    # 'legacy' seeds the global np.random (matches older sweeps); 'pcg64' gives the run its own
+    # Generator, independent of whatever else runs in the process.
+    rng = None
+    if spec.get('rng', 'legacy') == 'legacy':
+        np.random.seed(spec['seed'])
+    else:
+        rng = np.random.default_rng(spec['seed'])
+    dtype = spec.get('dtype', 'float64')
+    problem = build_problem(spec['problem'], spec['complexity'], scene=spec.get('scene'), dtype=dtype)
+
+    # With a checkpoint path the run continues from (or, once finished, is read back from)
+    # that file; its elapsed time includes the time spent before the checkpoint.
+    path = spec.get('checkpoint')
+    checkpointer = Checkpointer(path, spec.get('checkpoint_every', 10)) if path else None
+
+    start = time.perf_counter()
+    pso = PSO(problem.fitness_function, problem.get_bounds(), spec['num_particles'], spec['max_iter'],
+              topology=spec['topology'], neighbor_size=spec['neighbor_size'],
+              recorder=TrajectoryRecorder('off'), stopping=build_criteria(**spec.get('stopping', {})),
+              dtype=dtype, checkpointer=checkpointer, rng=rng)
+    resumed = 0.0
+    if path and os.path.exists(path):
+        state = load_checkpoint(path)
+        pso.set_state(state)
+        resumed = state['elapsed']
+    result = pso.optimize()
+    elapsed = time.perf_counter() - start + resumed
+    best_pos, best_val, _, cost_history = result
+
+    return {
+        'spec': spec,
+        'best_value': float(best_val),
+        'best_position': np.asarray(best_pos),
+        'cost_history': np.asarray(cost_history, dtype=float),
+        'elapsed': elapsed,
+        'stop_reason': result.stop_reason,
+        'iterations': result.iterations,
+        'evaluations': result.evaluations,
+    }
+
+
+def run_batch(grid, max_workers=None, progress=None):
+    if max_workers == 1:
+        results = []
+        for spec in grid:
+            results.append(run_single(spec))
+            if progress: progress(results[-1])
+        return results
+
+    # 'spawn' keeps workers independent of the parent's threads (the GUI runs this from a worker thread).
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=ctx) as pool:
+        for result in pool.map(run_single, grid):
+            results.append(result)
+            if progress: progress(result)
+    return results
+
+
+def _group_key(spec):
+    return (spec['problem'], spec['complexity'], spec['topology'], spec['num_particles'], spec['max_iter'])
+
+
+def _stack_histories(histories):
+    # Runs may stop at different lengths; a finished run keeps its last (best) cost.
+    length = max(len(h) for h in histories)
+    stacked = np.empty((len(histories), length))
+    for i, h in enumerate(histories):
+        stacked[i, :len(h)] = h
+        stacked[i, len(h):] = h[-1]
+    return stacked
+
+
+def aggregate(results, target_cost=None):
+    groups = {}
+    for result in results:
+        groups.setdefault(_group_key(result['spec']), []).append(result)
+
+    summary = []
+    for (problem, complexity, topology, n_part, n_iter), runs in groups.items():
+        costs = _stack_histories([r['cost_history'] for r in runs])
+        elapsed = np.array([r['elapsed'] for r in runs])
+
+        stats = {
+            'problem': problem,
+            'complexity': complexity,
+            'topology': topology,
+            'num_particles': n_part,
+            'max_iter': n_iter,
+            'runs': len(runs),
+            'seeds': [r['spec']['seed'] for r in runs],
+            'mean': costs.mean(axis=0),
+            'median': np.median(costs, axis=0),
+            'final_mean': float(costs[:, -1].mean()),
+            'final_median': float(np.median(costs[:, -1])),
+            'final_best': float(costs[:, -1].min()),
+            'elapsed_mean': float(elapsed.mean()),
+            'iterations_mean': float(np.mean([r['iterations'] for r in runs])),
+            'evaluations_mean': float(np.mean([r['evaluations'] for r in runs])),
+        }
+        for q, band in zip(PERCENTILES, np.percentile(costs, PERCENTILES, axis=0)):
+            stats[f'p{q}'] = band
+
+        if target_cost is not None:
+            reached = costs <= target_cost
+            hit = reached.any(axis=1)
+            iters = np.where(hit, reached.argmax(axis=1) + 1, -1)
+            # Seconds to target are estimated from each run's mean time per iteration.
+            seconds = np.array([r['elapsed'] * it / len(r['cost_history']) for r, it in zip(runs, iters)])
+            stats['target_cost'] = target_cost
+            stats['reached_fraction'] = float(hit.mean())
+            stats['iters_to_target_median'] = float(np.median(iters[hit])) if hit.any() else None
+            stats['time_to_target_median'] = float(np.median(seconds[hit])) if hit.any() else None
+
+        summary.append(stats)
+    return summary
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def add_stopping_arguments(parser):
+    group = parser.add_argument_group('early stopping')
+    group.add_argument('--stop-cost', type=float, default=None, help="stop once the best cost is <= this")
+    group.add_argument('--stall-window', type=int, default=None, help="stop after N iterations without improvement")
+    group.add_argument('--stall-tol', type=float, default=1e-6)
+    group.add_argument('--min-diversity', type=float, default=None, help="stop when the relative swarm spread drops below this")
+    group.add_argument('--max-seconds', type=float, default=None)
+    group.add_argument('--max-evals', type=int, default=None)
+
+
+def stopping_options(args):
+    return {
+        'target_cost': args.stop_cost,
+        'stall_window': args.stall_window,
+        'stall_tol': args.stall_tol,
+        'min_diversity': args.min_diversity,
+        'max_seconds': args.max_seconds,
+        'max_evaluations': args.max_evals,
+    }
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Headless PSO parameter sweep")
+    parser.add_argument('--problems', nargs='+', default=['pathfinding_2d'])
+    parser.add_argument('--topologies', nargs='+', choices=TOPOLOGIES, default=['global', 'social', 'geographic'])
+    parser.add_argument('--particles', nargs='+', type=int, default=[40])
+    parser.add_argument('--iterations', nargs='+', type=int, default=[100])
+    parser.add_argument('--seeds', type=int, default=10, help="number of seeds per configuration")
+    parser.add_argument('--seed-start', type=int, default=0)
+    parser.add_argument('--complexity', type=int, default=5)
+    parser.add_argument('--scene', default=None, help="scene file (JSON) replacing the built-in geometry")
+    parser.add_argument('--neighbor-size', type=int, default=5)
+    parser.add_argument('--dtype', choices=DTYPES, default='float64')
+    parser.add_argument('--rng', choices=RNG_KINDS, default='legacy',
+                        help="random source: seeded global np.random or a per-run PCG64 generator")
+    parser.add_argument('--target', type=float, default=None, help="target cost for time-to-target")
+    add_stopping_arguments(parser)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint-dir', default=None,
+                        help="checkpoint every run here; rerunning the sweep resumes interrupted runs")
+    parser.add_argument('--checkpoint-every', type=int, default=10, help="iterations between checkpoints")
+    parser.add_argument('--output', '-o', default=None, help="JSON file (default: stdout)")
+    return parser
+
+
+def main(argv=None, args=None):
+    args = args or build_parser().parse_args(argv)
+    grid = make_grid(args.problems, args.topologies, args.particles, args.iterations,
+                     range(args.seed_start, args.seed_start + args.seeds),
+                     complexity=args.complexity, neighbor_size=args.neighbor_size,
+                     stopping=stopping_options(args), dtype=args.dtype, scene=args.scene, rng=args.rng)
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        for spec in grid:
+            spec['checkpoint'] = os.path.join(args.checkpoint_dir, checkpoint_name(spec))
+            spec['checkpoint_every'] = args.checkpoint_every
+
+    done = []
+
+    def progress(result):
+        done.append(result)
+        spec = result['spec']
+        print(f"[{len(done)}/{len(grid)}] {spec['problem']} {spec['topology']} n={spec['num_particles']} "
+              f"it={spec['max_iter']} seed={spec['seed']}: {result['best_value']:.4f}", file=sys.stderr)
+
+    summary = aggregate(run_batch(grid, args.workers, progress), args.target)
+    text = json.dumps(_to_json(summary), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
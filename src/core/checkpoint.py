@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# Checkpoints are uncompressed npz files: the swarm arrays (positions, velocities, personal
+# bests, cost history, neighbour table) are stored as-is, everything else (iteration counters,
+# global best, random generator state) goes into a JSON 'meta' entry whose arrays are replaced
+# by references to npz entries. Restoring a checkpoint into a PSO built with the same settings
+# continues the run draw for draw, so the result is identical to an uninterrupted run. The one
+# exception is a FitnessCache objective: its contents are not saved and it resumes empty.
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def _pack(value, name, arrays):
+    if isinstance(value, (np.ndarray, np.generic)):
+        arrays[name] = np.asarray(value)
+        return {'__array__': name}
+    if isinstance(value, dict):
+        return {k: _pack(v, f'{name}.{k}', arrays) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(v, f'{name}.{i}', arrays) for i, v in enumerate(value)]
+    return value
+
+
+def _unpack(value, arrays):
+    if isinstance(value, dict):
+        if set(value) == {'__array__'}:
+            return arrays[value['__array__']]
+        return {k: _unpack(v, arrays) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unpack(v, arrays) for v in value]
+    return value
+
+
+def write_checkpoint(path, state):
+    arrays = {}
+    meta = _pack(state, 'state', arrays)
+    arrays['meta'] = np.array(json.dumps({'version': CHECKPOINT_FORMAT_VERSION, 'state': meta}))
+
+    # Written next to the target and renamed over it, so a crash mid-write leaves the previous
+    # checkpoint intact.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    if meta.get('version') != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {meta.get('version')!r}")
+    return _unpack(meta['state'], arrays)
+
+
+class Checkpointer:
+    # Saves the swarm state to `path` every `every` iterations and once more when the run ends.
+    # The iteration loop only pays for copying the state (a few small arrays); serializing and
+    # writing happen on a background thread. If a write is still running when the next
+    # checkpoint is due, the newer state replaces the one waiting, so a slow disk never stalls
+    # the run. Write errors are kept in `error` rather than interrupting the optimization.
+    def __init__(self, path, every=10):
+        self.path = path
+        self.every = max(1, int(every))
+        self.error = None
+        self.saved = 0
+        self._pending = None
+        self._writing = False
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def update(self, pso, iteration):
+        # Called by PSO after each iteration's move.
+        if (iteration + 1) % self.every == 0:
+            self.save(pso)
+
+    def save(self, pso, finished=False):
+        state = pso.get_state(finished)
+        with self._cond:
+            self._pending = state
+            if self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._write_loop, name='checkpoint-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+                self._writing = True
+            try:
+                write_checkpoint(self.path, state)
+                self.saved += 1
+            except Exception as exc:
+                self.error = exc
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def wait(self):
+        # Blocks until the latest saved state is on disk.
+        with self._cond:
+            while self._pending is not None or self._writing:
+                self._cond.wait()
+
+    def close(self):
+        self.wait()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
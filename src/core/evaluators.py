@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+EVALUATOR_BACKENDS = ('serial', 'thread', 'process')
+
+# Chunks handed out per worker on each call: more than one evens out uneven evaluation times.
+CHUNKS_PER_WORKER = 2
+
+
+def _evaluate_rows(objective_function, batch, positions):
+    if batch is not None:
+        return np.asarray(batch(positions), dtype=float)
+    return np.array([objective_function(p) for p in positions], dtype=float)
+
+
+def _chunks(n, chunk_size):
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+class _Evaluator:
+    # Evaluators expose fitness_batch, so PSO (and FitnessCache) use them like any batched
+    # objective: pass the evaluator as objective_function.
+    def __init__(self, objective_function, max_workers=None, chunk_size=None):
+        from src.core.pso_algorithm import resolve_batch_fitness
+
+        self.objective_function = objective_function
+        self.batch = resolve_batch_fitness(objective_function)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def _chunk_size(self, n):
+        if self.chunk_size:
+            return self.chunk_size
+        return max(1, -(-n // (self.max_workers * CHUNKS_PER_WORKER)))
+
+    def fitness_function(self, position):
+        return self.fitness_batch(np.asarray(position, dtype=float)[np.newaxis, :])[0]
+
+    __call__ = fitness_function
+
+    def clear(self):
+        # Called by PSO when the objective changed (e.g. a finer grid).
+        clear = getattr(self.objective_function, 'clear', None)
+        if clear is not None:
+            clear()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SerialEvaluator(_Evaluator):
+    def fitness_batch(self, positions):
+        return _evaluate_rows(self.objective_function, self.batch, np.asarray(positions, dtype=float))
+
+
+class ThreadEvaluator(_Evaluator):
+    # Useful when the objective spends its time in code that releases the GIL (NumPy, I/O,
+    # native extensions); pure-Python objectives should use ProcessEvaluator instead.
+    def __init__(self, objective_function, max_workers=None, chunk_size=None):
+        super().__init__(objective_function, max_workers, chunk_size)
+        self.pool = None
+
+    def fitness_batch(self, positions):
+        positions = np.asarray(positions, dtype=float)
+        values = np.empty(len(positions))
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def run(start, stop):
+            values[start:stop] = _evaluate_rows(self.objective_function, self.batch, positions[start:stop])
+
+        futures = [self.pool.submit(run, start, stop)
+                   for start, stop in _chunks(len(positions), self._chunk_size(len(positions)))]
+        for future in futures:
+            future.result()
+        return values
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+# Per-process state of ProcessEvaluator workers, set once by the pool initializer.
+_worker = {}
+
+
+def _init_worker(objective_function):
+    from src.core.pso_algorithm import resolve_batch_fitness
+
+    _worker['objective'] = objective_function
+    _worker['batch'] = resolve_batch_fitness(objective_function)
+    _worker['blocks'] = {}
+
+
+def _attach(name):
+    blocks = _worker['blocks']
+    block = blocks.get(name)
+    if block is None:
+        # The parent allocated a new (larger) block; drop the old mapping.
+        for old in blocks.values():
+            old.close()
+        blocks.clear()
+        block = blocks[name] = shared_memory.SharedMemory(name=name)
+    return block
+
+
+def _evaluate_chunk(name, capacity, dim, start, stop):
+    block = _attach(name)
+    positions = np.ndarray((capacity, dim), dtype=float, buffer=block.buf)
+    values = np.ndarray(capacity, dtype=float, buffer=block.buf, offset=positions.nbytes)
+    values[start:stop] = _evaluate_rows(_worker['objective'], _worker['batch'], positions[start:stop])
+
+
+class ProcessEvaluator(_Evaluator):
+    # Evaluates chunks of the swarm in a persistent process pool. The objective (a problem's
+    # bound fitness_function carries its obstacles, grid points, ...) is pickled once per
+    # worker by the pool initializer; each call only writes the positions into a shared-memory
+    # block and sends (start, stop) ranges, and workers write their costs back into it.
+    # The objective must be picklable and importable from the workers ('spawn' start method).
+    def __init__(self, objective_function, max_workers=None, chunk_size=None, context='spawn'):
+        super().__init__(objective_function, max_workers, chunk_size)
+        self.context = context
+        self.pool = None
+        self.block = None
+        self.capacity = 0
+        self.dim = None
+        self.positions = None
+        self.values = None
+
+    def _start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context(self.context),
+                                            initializer=_init_worker, initargs=(self.objective_function,))
+        return self.pool
+
+    def _reserve(self, n, dim):
+        if self.block is not None and n <= self.capacity and dim == self.dim:
+            return
+        self._release()
+        self.capacity = n
+        self.dim = dim
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, n * (dim + 1)) * 8)
+        self.positions = np.ndarray((n, dim), dtype=float, buffer=self.block.buf)
+        self.values = np.ndarray(n, dtype=float, buffer=self.block.buf, offset=self.positions.nbytes)
+
+    def _release(self):
+        if self.block is not None:
+            self.positions = self.values = None
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def fitness_batch(self, positions):
+        positions = np.asarray(positions, dtype=float)
+        n = len(positions)
+        if n == 0:
+            return np.empty(0)
+        self._reserve(n, positions.shape[1])
+        pool = self._start()
+
+        self.positions[:n] = positions
+        futures = [pool.submit(_evaluate_chunk, self.block.name, self.capacity, self.dim, start, stop)
+                   for start, stop in _chunks(n, self._chunk_size(n))]
+        for future in futures:
+            future.result()
+        return self.values[:n].copy()
+
+    def clear(self):
+        # Workers hold a copy of the objective: restart them so the next call ships its
+        # current state.
+        super().clear()
+        self._shutdown()
+
+    def _shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def close(self):
+        self._shutdown()
+        self._release()
+
+
+def make_evaluator(objective_function, backend='serial', max_workers=None, chunk_size=None):
+    if backend == 'serial':
+        return SerialEvaluator(objective_function)
+    if backend == 'thread':
+        return ThreadEvaluator(objective_function, max_workers, chunk_size)
+    if backend == 'process':
+        return ProcessEvaluator(objective_function, max_workers, chunk_size)
+    raise ValueError(f"unknown evaluator backend {backend!r}, expected one of {EVALUATOR_BACKENDS}")
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Per-entry overhead of an OrderedDict slot, the bytes key object and the float value.
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class FitnessCache:
+    # Memoizes an objective on positions quantized to `tolerance`: positions that fall in the
+    # same cell share one cached cost. Wrap a problem's fitness_function (or any callable) and
+    # pass the cache to PSO in its place; batched objectives are still called once per batch,
+    # with only the rows that missed.
+    def __init__(self, objective_function, tolerance=1e-6, max_bytes=64 * 1024 * 1024):
+        from src.core.pso_algorithm import resolve_batch_fitness
+
+        self.objective_function = objective_function
+        self.batch = resolve_batch_fitness(objective_function)
+        self.tolerance = tolerance
+        self.max_bytes = max_bytes
+        self.max_entries = None
+
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _keys(self, positions):
+        if self.tolerance > 0:
+            cells = np.floor(positions / self.tolerance).astype(np.int64)
+        else:
+            cells = np.ascontiguousarray(positions, dtype=float)
+        if self.max_entries is None:
+            self.max_entries = max(1, self.max_bytes // (cells.itemsize * cells.shape[1] + ENTRY_OVERHEAD_BYTES))
+        return [row.tobytes() for row in cells]
+
+    def _compute(self, positions):
+        if self.batch is not None:
+            return np.asarray(self.batch(positions), dtype=float)
+        return np.array([self.objective_function(p) for p in positions], dtype=float)
+
+    def fitness_batch(self, positions):
+        positions = np.asarray(positions)
+        keys = self._keys(positions)
+        values = np.empty(len(keys))
+
+        missing = {}
+        for i, key in enumerate(keys):
+            value = self.entries.get(key)
+            if value is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                self.entries.move_to_end(key)
+                values[i] = value
+        self.hits += len(keys) - sum(len(rows) for rows in missing.values())
+
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            computed = self._compute(positions[first_rows])
+            self.misses += len(first_rows)
+            for (key, rows), value in zip(missing.items(), computed):
+                values[rows] = value
+                self.entries[key] = float(value)
+
+            overflow = len(self.entries) - self.max_entries
+            for _ in range(max(0, overflow)):
+                self.entries.popitem(last=False)
+            self.evictions += max(0, overflow)
+
+        return values
+
+    def fitness_function(self, position):
+        return self.fitness_batch(np.asarray(position)[np.newaxis, :])[0]
+
+    __call__ = fitness_function
+
+    def clear(self):
+        self.entries.clear()
+        clear = getattr(self.objective_function, 'clear', None)
+        if clear is not None:
+            clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+        }
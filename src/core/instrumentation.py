@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+
+PHASES = ('fitness', 'bests', 'neighbors', 'velocity', 'record', 'stopping', 'checkpoint')
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+def null_phase(name):
+    return NULL_PHASE
+
+
+class _PhaseTimer:
+    __slots__ = ('profiler', 'column', 'start')
+
+    def __init__(self, profiler, column):
+        self.profiler = profiler
+        self.column = column
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.timings[self.profiler.row, self.column] += time.perf_counter() - self.start
+        return False
+
+
+class Profiler:
+    # Per-phase timers for the PSO loop. PSO calls phase(name) around each part of an
+    # iteration; when no profiler is given it uses null_phase, so the disabled cost is one
+    # no-op context manager per phase.
+    def __init__(self, on_iteration_start=None, on_iteration_end=None):
+        self.on_iteration_start = on_iteration_start
+        self.on_iteration_end = on_iteration_end
+        self._timers = {name: _PhaseTimer(self, i) for i, name in enumerate(PHASES)}
+        self.timings = np.zeros((0, len(PHASES)))
+        self.evaluations = np.zeros(0, dtype=np.int64)
+        self.fitness_calls = 0
+        self.row = 0
+        self.iterations = 0
+
+    def allocate(self, max_iter):
+        # One extra row collects work done outside the iteration loop (e.g. re-scoring).
+        self.timings = np.zeros((max_iter + 1, len(PHASES)))
+        self.evaluations = np.zeros(max_iter + 1, dtype=np.int64)
+        self.row = max_iter
+        self.iterations = 0
+
+    def phase(self, name):
+        return self._timers[name]
+
+    def count_evaluations(self, n):
+        self.fitness_calls += 1
+        self.evaluations[self.row] += n
+
+    def iteration_start(self, pso, iteration):
+        self.row = iteration
+        if self.on_iteration_start is not None:
+            self.on_iteration_start(pso, iteration)
+
+    def iteration_end(self, pso, iteration):
+        self.iterations = iteration + 1
+        if self.on_iteration_end is not None:
+            self.on_iteration_end(pso, iteration)
+        self.row = len(self.timings) - 1
+
+    def summary(self):
+        rows = np.vstack([self.timings[:self.iterations], self.timings[-1:]])
+        return ProfileSummary(dict(zip(PHASES, rows.sum(axis=0))), self.iterations,
+                              int(self.evaluations.sum()), self.fitness_calls,
+                              self.timings[:self.iterations].copy())
+
+
+class ProfileSummary:
+    def __init__(self, totals, iterations, evaluations, fitness_calls, per_iteration):
+        self.totals = totals
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.fitness_calls = fitness_calls
+        self.per_iteration = per_iteration
+
+    @property
+    def total(self):
+        return sum(self.totals.values())
+
+    def as_dict(self):
+        return {
+            'phases': {name: float(t) for name, t in self.totals.items()},
+            'total': float(self.total),
+            'iterations': self.iterations,
+            'evaluations': self.evaluations,
+            'fitness_calls': self.fitness_calls,
+        }
+
+    def lines(self):
+        total = self.total or 1.0
+        lines = [f"{'phase':<10} {'total':>9} {'/iter':>9} {'%':>6}"]
+        for name, t in self.totals.items():
+            per_iter = t / self.iterations if self.iterations else 0.0
+            lines.append(f"{name:<10} {t * 1e3:7.1f}ms {per_iter * 1e3:7.2f}ms {100 * t / total:5.1f}%")
+        rate = self.evaluations / self.totals['fitness'] if self.totals['fitness'] else 0.0
+        lines.append(f"evaluations: {self.evaluations} ({self.fitness_calls} calls, {rate:.0f}/s)")
+        return lines
+
+    def __str__(self):
+        return "\n".join(self.lines())
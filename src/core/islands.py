@@ -0,0 +1,269 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.core import batch
+from src.core.pso_algorithm import PSO, PSOResult
+from src.core.recorder import TrajectoryRecorder
+from src.core.rng import spawn_rngs
+from src.core.stopping import build_criteria
+from src.core.topologies import TOPOLOGIES
+from src.problems.registry import PROBLEMS, build_problem
+
+MIGRATION_GRAPHS = ('ring', 'full')
+
+
+def migration_sources(graph, n_islands):
+    # sources[i] lists the islands whose emigrants island i receives.
+    if graph == 'ring':
+        return [[(i - 1) % n_islands] if n_islands > 1 else [] for i in range(n_islands)]
+    if graph == 'full':
+        return [[j for j in range(n_islands) if j != i] for i in range(n_islands)]
+    raise ValueError(f"unknown migration graph {graph!r}, expected one of {MIGRATION_GRAPHS}")
+
+
+def make_islands(n_islands, num_particles, topologies=('global',), inertia=((0.9, 0.4),), neighbor_size=5):
+    # Island settings cycle through the given topologies and (w_start, w_end) schedules.
+    return [{
+        'num_particles': num_particles,
+        'topology': topologies[i % len(topologies)],
+        'w_start': inertia[i % len(inertia)][0],
+        'w_end': inertia[i % len(inertia)][1],
+        'neighbor_size': neighbor_size,
+    } for i in range(n_islands)]
+
+
+class _Island:
+    def __init__(self, problem, complexity, island, max_iter, rng, stopping, scene):
+        self.problem = build_problem(problem, complexity, scene=scene)
+        self.pso = PSO(self.problem.fitness_function, self.problem.get_bounds(), island['num_particles'],
+                       max_iter, w_start=island['w_start'], w_end=island['w_end'], topology=island['topology'],
+                       neighbor_size=island['neighbor_size'], recorder=TrajectoryRecorder('off'),
+                       stopping=build_criteria(**(stopping or {})), rng=rng)
+        self.steps = self.pso.steps()
+        self.done = False
+
+    def advance(self, iterations, migrants):
+        # Runs up to `iterations` more iterations; returns whether the island has finished.
+        if not self.done:
+            if migrants is not None:
+                self.pso.inject(*migrants)
+            for _ in range(iterations):
+                try:
+                    snapshot = next(self.steps)
+                except StopIteration:
+                    self.done = True
+                    break
+                if snapshot.stop_reason is not None:
+                    self.steps.close()
+                    self.done = True
+                    break
+        return self.done
+
+    def emigrants(self, count):
+        return self.pso.elite(count)
+
+    def final(self):
+        if not self.done:
+            self.steps.close()
+        result = self.pso.result()
+        return {
+            'best_value': float(result.best_value),
+            'best_position': np.asarray(result.best_position),
+            'cost_history': np.asarray(result.cost_history, dtype=float),
+            'stop_reason': result.stop_reason,
+            'iterations': result.iterations,
+            'evaluations': result.evaluations,
+        }
+
+
+def _island_process(conn, args):
+    island = _Island(*args)
+    while True:
+        command, payload = conn.recv()
+        if command == 'advance':
+            conn.send(island.advance(*payload))
+        elif command == 'emigrants':
+            conn.send(island.emigrants(payload))
+        elif command == 'final':
+            conn.send(island.final())
+            break
+    conn.close()
+
+
+class _RemoteIsland:
+    # Same interface as _Island, forwarded to an island running in its own process.
+    def __init__(self, ctx, args):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_island_process, args=(child, args), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, command, payload=None):
+        self.conn.send((command, payload))
+
+    def receive(self):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class _LocalIsland:
+    # Every island draws from its own generator, so running them one after another in this
+    # process matches the per-process runs draw for draw.
+    def __init__(self, args):
+        self.island = _Island(*args)
+        self.reply = None
+
+    def send(self, command, payload=None):
+        if command == 'advance':
+            self.reply = self.island.advance(*payload)
+        elif command == 'emigrants':
+            self.reply = self.island.emigrants(payload)
+        elif command == 'final':
+            self.reply = self.island.final()
+
+    def receive(self):
+        return self.reply
+
+    def close(self):
+        pass
+
+
+def _select_migrants(candidates, count):
+    positions = np.concatenate([c[0] for c in candidates])
+    values = np.concatenate([c[1] for c in candidates])
+    order = np.argsort(values, kind='stable')[:count]
+    return positions[order], values[order]
+
+
+def run_islands(problem, islands, max_iter, complexity=5, migration_interval=10, migrants=2, graph='ring',
+                seed=None, stopping=None, processes=True, scene=None):
+    # Runs the sub-swarms in lockstep epochs of `migration_interval` iterations. Between epochs
+    # every island sends its `migrants` best particles along the migration graph and replaces
+    # its worst particles with the best of what it received. Islands advance concurrently when
+    # `processes` is true (one 'spawn' process each) and one after another otherwise. Islands draw
+    # from independent random streams spawned from `seed`, so both give the same result for it.
+    sources = migration_sources(graph, len(islands))
+    args = [(problem, complexity, island, max_iter, rng, stopping, scene)
+            for island, rng in zip(islands, spawn_rngs(seed, len(islands)))]
+
+    start = time.perf_counter()
+    if processes:
+        ctx = multiprocessing.get_context('spawn')
+        workers = [_RemoteIsland(ctx, a) for a in args]
+    else:
+        workers = [_LocalIsland(a) for a in args]
+
+    try:
+        incoming = [None] * len(islands)
+        migrations = 0
+        done = [False] * len(islands)
+        iteration = 0
+        while not all(done) and iteration < max_iter:
+            epoch = min(migration_interval, max_iter - iteration)
+            for worker, received in zip(workers, incoming):
+                worker.send('advance', (epoch, received))
+            done = [worker.receive() for worker in workers]
+            iteration += epoch
+            if all(done) or iteration >= max_iter or migrants <= 0:
+                break
+
+            for worker in workers:
+                worker.send('emigrants', migrants)
+            emigrants = [worker.receive() for worker in workers]
+            incoming = [_select_migrants([emigrants[j] for j in sources[i]], migrants) if sources[i] else None
+                        for i in range(len(islands))]
+            migrations += 1
+
+        for worker in workers:
+            worker.send('final')
+        finals = [worker.receive() for worker in workers]
+    finally:
+        for worker in workers:
+            worker.close()
+    elapsed = time.perf_counter() - start
+
+    for island, final in zip(islands, finals):
+        final['island'] = island
+    best = min(finals, key=lambda f: f['best_value'])
+    cost_history = list(batch._stack_histories([f['cost_history'] for f in finals]).min(axis=0))
+    return PSOResult(best['best_position'], best['best_value'], TrajectoryRecorder('off'), cost_history,
+                     stop_reason='all_stopped' if all(done) else 'max_iter', iterations=len(cost_history),
+                     evaluations=sum(f['evaluations'] for f in finals), islands=finals,
+                     migrations=migrations, elapsed=elapsed)
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Multi-swarm island model with periodic migration")
+    parser.add_argument('--problem', choices=sorted(PROBLEMS), default='pathfinding_2d')
+    parser.add_argument('--complexity', type=int, default=5)
+    parser.add_argument('--scene', default=None, help="scene file (JSON) replacing the built-in geometry")
+    parser.add_argument('--islands', type=int, default=os.cpu_count() or 1, help="number of sub-swarms")
+    parser.add_argument('--particles', type=int, default=40, help="particles per island")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--topologies', nargs='+', choices=TOPOLOGIES, default=['global'],
+                        help="cycled over the islands")
+    parser.add_argument('--inertia', nargs='+', default=['0.9:0.4'],
+                        help="w_start:w_end schedules cycled over the islands")
+    parser.add_argument('--neighbor-size', type=int, default=5)
+    parser.add_argument('--interval', type=int, default=10, help="iterations between migrations")
+    parser.add_argument('--migrants', type=int, default=2, help="particles sent per island and migration")
+    parser.add_argument('--graph', choices=MIGRATION_GRAPHS, default='ring')
+    parser.add_argument('--seed', type=int, default=None)
+    batch.add_stopping_arguments(parser)
+    parser.add_argument('--serial', action='store_true', help="run the islands in this process")
+    parser.add_argument('--output', '-o', default=None, help="JSON file (default: stdout)")
+    return parser
+
+
+def main(argv=None, args=None):
+    args = args or build_parser().parse_args(argv)
+    inertia = [tuple(float(w) for w in schedule.split(':')) for schedule in args.inertia]
+    islands = make_islands(args.islands, args.particles, args.topologies, inertia, args.neighbor_size)
+    result = run_islands(args.problem, islands, args.iterations, complexity=args.complexity,
+                         migration_interval=args.interval, migrants=args.migrants, graph=args.graph,
+                         seed=args.seed, stopping=batch.stopping_options(args), processes=not args.serial,
+                         scene=args.scene)
+
+    output = {
+        'problem': args.problem,
+        'complexity': args.complexity,
+        'scene': args.scene,
+        'graph': args.graph,
+        'interval': args.interval,
+        'migrants': args.migrants,
+        'seed': args.seed,
+        'elapsed': result.elapsed,
+        'migrations': result.migrations,
+        'evaluations': result.evaluations,
+        'best_value': float(result.best_value),
+        'best_position': np.asarray(result.best_position),
+        'cost_history': np.asarray(result.cost_history, dtype=float),
+        'islands': [{k: v for k, v in final.items() if k != 'cost_history'} for final in result.islands],
+    }
+    text = json.dumps(batch._to_json(output), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    print(f"{args.problem}: best cost {result.best_value:.4f} from {len(islands)} islands in {result.elapsed:.2f}s "
+          f"({result.migrations} migrations)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Coarse-to-fine fitness: the problem is evaluated on a cheap grid first and refined through
+# `levels` as the run progresses. The problem only needs a set_resolution(level) method.
+# PSO re-scores the personal and global bests after every refinement, so incumbents are
+# always compared at the current resolution.
+
+
+class ResolutionSchedule:
+    def __init__(self, problem, levels, switch_at=None, stall_window=None, stall_tol=0.0, min_diversity=None):
+        self.problem = problem
+        self.levels = list(levels)
+        # Fraction of max_iter at which each level after the first starts (default: even split).
+        if switch_at is None:
+            switch_at = [i / len(self.levels) for i in range(1, len(self.levels))]
+        self.switch_at = list(switch_at)
+        if len(self.switch_at) != len(self.levels) - 1:
+            raise ValueError("switch_at needs one entry per refinement (len(levels) - 1)")
+        self.stall_window = stall_window
+        self.stall_tol = stall_tol
+        self.min_diversity = min_diversity
+        self.index = 0
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    @property
+    def is_final(self):
+        return self.index == len(self.levels) - 1
+
+    def reset(self, pso):
+        self.index = 0
+        self.problem.set_resolution(self.level)
+        span = pso.upper - pso.lower
+        self.span = np.where(span > 0, span, 1.0)
+
+    def seek(self, index):
+        # Jumps to a level directly (used when a checkpointed run resumes).
+        self.index = index
+        self.problem.set_resolution(self.level)
+
+    def _converged(self, pso):
+        level_history = pso.cost_history[pso.level_start:]
+        if self.stall_window and len(level_history) > self.stall_window:
+            if level_history[-self.stall_window - 1] - level_history[-1] <= self.stall_tol:
+                return True
+        if self.min_diversity is not None:
+            spread = float(np.mean(np.std(pso.positions, axis=0) / self.span))
+            if spread < self.min_diversity:
+                return True
+        return False
+
+    def update(self, pso, iteration):
+        # Returns True when the problem was switched to a finer level.
+        if self.is_final:
+            return False
+        due = iteration + 1 >= self.switch_at[self.index] * pso.max_iter
+        if due or self._converged(pso):
+            self.index += 1
+            self.problem.set_resolution(self.level)
+            return True
+        return False
+
+    def finalize(self, pso):
+        # A run that stops early still reports its result at the finest resolution.
+        if self.is_final:
+            return False
+        self.index = len(self.levels) - 1
+        self.problem.set_resolution(self.level)
+        return True
@@ -0,0 +1,52 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+KDTREE_MAX_DIM = 8
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _knn_brute(points, k):
+    # The expansion |a|^2 + |b|^2 - 2ab cancels badly once the swarm has converged far from
+    # the origin: it runs in float64 whatever the swarm dtype, on points centred on their mean.
+    points = np.asarray(points, dtype=np.float64)
+    points = points - points.mean(axis=0)
+    n = points.shape[0]
+    sq_norms = np.einsum('ij,ij->i', points, points)
+    block = max(1, BLOCK_BYTES // (8 * n))
+
+    indices = np.empty((n, k), dtype=np.intp)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        rows = np.arange(start, stop)
+        dists_sq = sq_norms[start:stop, np.newaxis] + sq_norms[np.newaxis, :] - 2.0 * (points[start:stop] @ points.T)
+        # Every particle is its own nearest neighbour, whatever the rounding in the expansion above.
+        dists_sq[rows - start, rows] = -np.inf
+        indices[start:stop] = np.argpartition(dists_sq, k - 1, axis=1)[:, :k]
+    return indices
+
+
+def _knn_kdtree(points, k):
+    _, indices = cKDTree(points).query(points, k=k)
+    return indices.reshape(points.shape[0], k)
+
+
+def knn_indices(points, k, method='auto'):
+    n, dim = points.shape
+    k = min(k, n)
+    if k == n:
+        return np.broadcast_to(np.arange(n), (n, n))
+
+    if method == 'auto':
+        method = 'kdtree' if cKDTree is not None and dim <= KDTREE_MAX_DIM else 'brute'
+
+    if method == 'kdtree':
+        if cKDTree is None:
+            raise ImportError("method='kdtree' requires scipy")
+        return _knn_kdtree(points, k)
+    if method == 'brute':
+        return _knn_brute(points, k)
+    raise ValueError(f"Unknown neighbour search method: {method}")
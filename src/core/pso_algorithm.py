@@ -1,21 +1,68 @@
+import time
+
 import numpy as np
-import copy
 
+from src.core.instrumentation import null_phase
+from src.core.neighbors import knn_indices
+from src.core.recorder import TrajectoryRecorder
+from src.core.rng import get_rng_state, random_floats, resolve_rng, set_rng_state
+from src.core.topologies import STAR_HUB, TOPOLOGIES, build_neighbor_table
+
+
+def resolve_batch_fitness(objective_function):
+    batch = getattr(objective_function, 'fitness_batch', None)
+    if batch is None and getattr(objective_function, '__name__', None) == 'fitness_function':
+        batch = getattr(getattr(objective_function, '__self__', None), 'fitness_batch', None)
+    return batch
+
+
+def objective_name(objective_function):
+    # Identifies the problem behind an objective (through evaluators and caches), e.g.
+    # 'WifiProblem.fitness_function'.
+    while hasattr(objective_function, 'objective_function'):
+        objective_function = objective_function.objective_function
+    return getattr(objective_function, '__qualname__', type(objective_function).__name__)
+
+
+class PSOResult(tuple):
+    # Unpacks like the classic (best_position, best_value, history, cost_history) tuple and
+    # carries run information (stop_reason, iterations, evaluations) as attributes.
+    def __new__(cls, best_position, best_value, history, cost_history, **info):
+        result = super().__new__(cls, (best_position, best_value, history, cost_history))
+        result.__dict__.update(info)
+        return result
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    best_position = property(lambda self: self[0])
+    best_value = property(lambda self: self[1])
+    history = property(lambda self: self[2])
+    cost_history = property(lambda self: self[3])
 
-class Particle:
-    def __init__(self, bounds, dimension):
-        self.position = np.array([np.random.uniform(b[0], b[1]) for b in bounds])
-        self.velocity = np.zeros(dimension)
-        self.best_position = copy.deepcopy(self.position)
-        self.best_value = float('inf')
-        self.current_value = float('inf')
+
+class PSOSnapshot:
+    # Progress after one iteration. `positions` (when requested) is a view of the live swarm
+    # state and is only valid until the generator is resumed; copy it to keep it.
+    __slots__ = ('iteration', 'best_value', 'best_position', 'positions', 'evaluations', 'stop_reason')
+
+    def __init__(self, iteration, best_value, best_position, positions=None, evaluations=0, stop_reason=None):
+        self.iteration = iteration
+        self.best_value = best_value
+        self.best_position = best_position
+        self.positions = positions
+        self.evaluations = evaluations
+        self.stop_reason = stop_reason
 
 
 class PSO:
     def __init__(self, objective_function, bounds, num_particles, max_iter,
                  w_start=0.9, w_end=0.4, c1=1.49, c2=1.49,
-                 topology='global', neighbor_size=3):
+                 topology='global', neighbor_size=3, neighbor_method='auto', topology_seed=None,
+                 recorder=None, stopping=None, resolution_schedule=None, profiler=None, dtype=np.float64,
+                 checkpointer=None, rng=None):
         self.fitness_func = objective_function
+        self.fitness_batch = resolve_batch_fitness(objective_function)
         self.bounds = bounds
         self.dim = len(bounds)
         self.num_particles = num_particles
@@ -27,79 +74,327 @@ class PSO:
 
         self.c1 = c1
         self.c2 = c2
-        self.topology = topology
+        self.topology = topology.lower().replace(' ', '_')
+        if self.topology not in TOPOLOGIES:
+            raise ValueError(f"unknown topology {topology!r}, expected one of {TOPOLOGIES}")
         self.neighbor_size = neighbor_size
+        self.neighbor_method = neighbor_method
 
-        self.v_max = np.array([0.2 * (b[1] - b[0]) for b in bounds])
+        # Positions and velocities use `dtype` (float32 halves the memory traffic of the swarm
+        # and of the problems' distance kernels); costs are always float64 so comparisons
+        # between them stay exact.
+        self.dtype = np.dtype(dtype)
+        self.lower = np.array([b[0] for b in bounds], dtype=self.dtype)
+        self.upper = np.array([b[1] for b in bounds], dtype=self.dtype)
+        self.v_max = 0.2 * (self.upper - self.lower)
 
-        self.swarm = [Particle(bounds, self.dim) for _ in range(num_particles)]
-        self.global_best_position = np.zeros(self.dim)
+        # Swarm state lives in (num_particles, dim) arrays. Random draws come from `rng` (see
+        # rng.py; None is the global np.random, drawn in the same order as the original
+        # per-particle version, so seeded runs reproduce its results).
+        self.rng = resolve_rng(rng)
+        self.positions = self.rng.uniform(self.lower, self.upper,
+                                          size=(num_particles, self.dim)).astype(self.dtype, copy=False)
+        self.velocities = np.zeros((num_particles, self.dim), dtype=self.dtype)
+        self.best_positions = self.positions.copy()
+        self.best_values = np.full(num_particles, np.inf)
+        self.current_values = np.full(num_particles, np.inf)
+
+        self.global_best_position = np.zeros(self.dim, dtype=self.dtype)
         self.global_best_value = float('inf')
 
-        self.history = []
+        # A random topology without its own seed draws from the run's generator (np.random by
+        # default), so seeded runs reproduce it.
+        if topology_seed is None:
+            topology_seed = self.rng
+        self.neighbor_table = build_neighbor_table(self.topology, num_particles, neighbor_size, topology_seed)
+
+        self.history = recorder if recorder is not None else TrajectoryRecorder()
+        self.history.allocate(max_iter, num_particles, self.dim)
         self.cost_history = []
 
-    def _get_social_target(self, particle_index):
+        self.stopping = list(stopping or [])
+        self.evaluations = 0
+        self.iterations_run = 0
+        self.stop_reason = None
+
+        self.resolution_schedule = resolution_schedule
+        self.level_start = 0
+
+        # Set by set_state() to continue a checkpointed run (see checkpoint.py).
+        self.checkpointer = checkpointer
+        self.start_iteration = 0
+        self.start_level = 0
+        self.finished = False
+        # Seconds spent inside steps(), carried over from earlier sessions of a resumed run.
+        self.elapsed = 0.0
+        self._clock = 0.0
+
+        self.profiler = profiler
+        self._phase = null_phase
+        if profiler is not None:
+            profiler.allocate(max_iter)
+            self._phase = profiler.phase
+
+    def _local_best_targets(self, neighbors_indices):
+        neighbor_values = self.best_values[neighbors_indices]
+        best = np.argmin(neighbor_values, axis=1)
+        rows = np.arange(self.num_particles)
+        chosen = neighbors_indices[rows, best]
+
+        # Neighbourhoods without any evaluated particle fall back to the particle's own best.
+        chosen = np.where(np.isfinite(neighbor_values[rows, best]), chosen, rows)
+        return self.best_positions[chosen]
+
+    def _get_social_targets(self):
+        if self.neighbor_table is not None:
+            targets = self._local_best_targets(self.neighbor_table)
+            if self.topology == 'star':
+                # The hub's neighbourhood is the whole swarm.
+                best = np.argmin(self.best_values)
+                if np.isfinite(self.best_values[best]):
+                    targets[STAR_HUB] = self.best_positions[best]
+            return targets
+
+        if self.topology == 'geographic':
+            neighbors_indices = knn_indices(self.positions, self.neighbor_size, self.neighbor_method)
+            return self._local_best_targets(neighbors_indices)
+
         if self.topology == 'global':
             return self.global_best_position
+        return self.best_positions
 
-        neighbors_indices = []
+    def _evaluate(self, positions):
+        self.evaluations += len(positions)
+        if self.profiler is not None:
+            self.profiler.count_evaluations(len(positions))
+        if self.fitness_batch is not None:
+            return np.asarray(self.fitness_batch(positions), dtype=float)
+        return np.array([self.fitness_func(position) for position in positions], dtype=float)
 
-        if self.topology == 'social':
-            start = particle_index - (self.neighbor_size // 2)
-            for i in range(start, start + self.neighbor_size):
-                neighbors_indices.append(i % self.num_particles)
+    def _check_stopping(self):
+        schedule = self.resolution_schedule
+        coarse = schedule is not None and not schedule.is_final
+        for criterion in self.stopping:
+            if coarse and getattr(criterion, 'uses_cost', False):
+                continue
+            reason = criterion.check(self)
+            if reason is not None:
+                return reason
+        return None
 
-        elif self.topology == 'geographic':
-            current_pos = self.swarm[particle_index].position
-            all_positions = np.array([p.position for p in self.swarm])
+    def _rescore(self):
+        # Called after the objective changed (e.g. a finer grid): re-evaluate the incumbents so
+        # they stay comparable with the new costs.
+        clear_cache = getattr(self.fitness_func, 'clear', None)
+        if clear_cache is not None:
+            clear_cache()
+        with self._phase('fitness'):
+            values = self._evaluate(self.best_positions)
+        self.best_values = values
+        best_idx = np.argmin(values)
+        self.global_best_value = values[best_idx]
+        self.global_best_position = self.best_positions[best_idx].copy()
+        self.level_start = len(self.cost_history)
 
-            dists = np.linalg.norm(all_positions - current_pos, axis=1)
-            neighbors_indices = np.argsort(dists)[:self.neighbor_size]
+    def elite(self, count):
+        # The `count` best personal bests, best first (e.g. emigrants for an island model).
+        order = np.argsort(self.best_values, kind='stable')[:count]
+        return self.best_positions[order].copy(), self.best_values[order].copy()
 
-        best_neighbor_val = float('inf')
-        best_neighbor_pos = self.swarm[particle_index].best_position
+    def inject(self, positions, values):
+        # Replaces the particles with the worst personal bests by already-evaluated positions.
+        positions = np.asarray(positions, dtype=self.dtype).reshape(-1, self.dim)
+        values = np.asarray(values, dtype=float)
+        count = min(len(values), self.num_particles)
+        if count == 0:
+            return
+        worst = np.argsort(self.best_values, kind='stable')[::-1][:count]
+        self.positions[worst] = positions[:count]
+        self.best_positions[worst] = positions[:count]
+        self.best_values[worst] = values[:count]
+        self.current_values[worst] = values[:count]
+        self.velocities[worst] = 0.0
 
-        for idx in neighbors_indices:
-            if self.swarm[idx].best_value < best_neighbor_val:
-                best_neighbor_val = self.swarm[idx].best_value
-                best_neighbor_pos = self.swarm[idx].best_position
+        best_idx = np.argmin(values[:count])
+        if values[best_idx] < self.global_best_value:
+            self.global_best_value = values[best_idx]
+            self.global_best_position = positions[best_idx].copy()
 
-        return best_neighbor_pos
+    def get_state(self, finished=False):
+        # Everything a resumed run needs, copied so the swarm can move on while it is written.
+        # `finished` marks the state of a completed run (resuming it runs no more iterations).
+        schedule = self.resolution_schedule
+        return {
+            'objective': objective_name(self.fitness_func),
+            'num_particles': self.num_particles,
+            'dim': self.dim,
+            'dtype': self.dtype.name,
+            'max_iter': self.max_iter,
+            'topology': self.topology,
+            'neighbor_size': self.neighbor_size,
+            'lower': self.lower.copy(),
+            'upper': self.upper.copy(),
+            'iteration': self.iterations_run,
+            'evaluations': self.evaluations,
+            'elapsed': self.elapsed,
+            'w': self.w,
+            'level_start': self.level_start,
+            'level': schedule.index if schedule is not None else 0,
+            'stop_reason': self.stop_reason if finished else None,
+            'positions': self.positions.copy(),
+            'velocities': self.velocities.copy(),
+            'best_positions': self.best_positions.copy(),
+            'best_values': self.best_values.copy(),
+            'current_values': np.array(self.current_values, dtype=float),
+            'global_best_position': np.array(self.global_best_position, dtype=self.dtype),
+            'global_best_value': np.float64(self.global_best_value),
+            'cost_history': np.array(self.cost_history, dtype=float),
+            'neighbor_table': self.neighbor_table.copy() if self.neighbor_table is not None else None,
+            'random_state': get_rng_state(self.rng),
+        }
 
-    def optimize(self):
-        for iteration in range(self.max_iter):
+    def set_state(self, state):
+        # Continues from get_state() (e.g. a loaded checkpoint) in a PSO built with the same
+        # problem and settings. The trajectory recorder and profiler only see the resumed part.
+        if (state['num_particles'], state['dim']) != (self.num_particles, self.dim):
+            raise ValueError(f"checkpoint has {state['num_particles']} particles in {state['dim']} dimensions, "
+                             f"this swarm {self.num_particles} in {self.dim}")
+        if np.dtype(state['dtype']) != self.dtype:
+            raise ValueError(f"checkpoint dtype {state['dtype']} does not match the swarm dtype {self.dtype.name}")
+        settings = {'objective': objective_name(self.fitness_func), 'max_iter': self.max_iter,
+                    'topology': self.topology, 'neighbor_size': self.neighbor_size}
+        for key, value in settings.items():
+            if state[key] != value:
+                raise ValueError(f"checkpoint {key} {state[key]!r} does not match this run's {value!r}")
+        if not (np.array_equal(state['lower'], self.lower) and np.array_equal(state['upper'], self.upper)):
+            raise ValueError("checkpoint search bounds do not match this problem's bounds")
+
+        self.positions = np.array(state['positions'], dtype=self.dtype)
+        self.velocities = np.array(state['velocities'], dtype=self.dtype)
+        self.best_positions = np.array(state['best_positions'], dtype=self.dtype)
+        self.best_values = np.array(state['best_values'], dtype=float)
+        self.current_values = np.array(state['current_values'], dtype=float)
+        self.global_best_position = np.array(state['global_best_position'], dtype=self.dtype)
+        self.global_best_value = np.float64(state['global_best_value'])
+        self.cost_history = list(np.asarray(state['cost_history'], dtype=float))
+        if state['neighbor_table'] is not None:
+            self.neighbor_table = np.array(state['neighbor_table'])
+
+        self.w = state['w']
+        self.evaluations = state['evaluations']
+        self.elapsed = state['elapsed']
+        self.iterations_run = state['iteration']
+        self.level_start = state['level_start']
+        self.start_iteration = state['iteration']
+        self.start_level = state['level']
+        self.finished = state['stop_reason'] is not None
+        self.stop_reason = state['stop_reason']
+        set_rng_state(self.rng, state['random_state'])
+
+    def _move(self):
+        with self._phase('neighbors'):
+            target_social = self._get_social_targets()
+
+        with self._phase('velocity'):
+            r = random_floats(self.rng, (self.num_particles, 2, self.dim), self.dtype)
+            r1 = r[:, 0, :]
+            r2 = r[:, 1, :]
+
+            cognitive = self.c1 * r1 * (self.best_positions - self.positions)
+            social = self.c2 * r2 * (target_social - self.positions)
+
+            self.velocities = (self.w * self.velocities) + cognitive + social
+            np.clip(self.velocities, -self.v_max, self.v_max, out=self.velocities)
+            self.positions += self.velocities
+            np.clip(self.positions, self.lower, self.upper, out=self.positions)
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.elapsed += now - self._clock
+        self._clock = now
+
+    def steps(self, positions=False):
+        # Time spent outside the generator (between snapshots) is not counted in `elapsed`.
+        self._clock = time.perf_counter()
+        for criterion in self.stopping:
+            criterion.reset(self)
+        if not self.finished:
+            self.stop_reason = 'max_iter'
+        if self.resolution_schedule is not None:
+            self.resolution_schedule.reset(self)
+            if self.start_level:
+                self.resolution_schedule.seek(self.start_level)
+
+        profiler = self.profiler
+        checkpointer = self.checkpointer
+        first = self.max_iter if self.finished else self.start_iteration
+        for iteration in range(first, self.max_iter):
+            if profiler is not None:
+                profiler.iteration_start(self, iteration)
             self.w = self.w_start - (self.w_start - self.w_end) * (iteration / self.max_iter)
 
-            self.history.append([p.position.copy() for p in self.swarm])
+            with self._phase('fitness'):
+                fitness = self._evaluate(self.positions)
+            self.current_values = fitness
+
+            with self._phase('bests'):
+                improved = fitness < self.best_values
+                self.best_values[improved] = fitness[improved]
+                self.best_positions[improved] = self.positions[improved]
 
-            for i, particle in enumerate(self.swarm):
-                fitness = self.fitness_func(particle.position)
-                particle.current_value = fitness
+                best_idx = np.argmin(fitness)
+                if fitness[best_idx] < self.global_best_value:
+                    self.global_best_value = fitness[best_idx]
+                    self.global_best_position = self.positions[best_idx].copy()
 
-                if fitness < particle.best_value:
-                    particle.best_value = fitness
-                    particle.best_position = particle.position.copy()
+                self.cost_history.append(self.global_best_value)
 
-                if fitness < self.global_best_value:
-                    self.global_best_value = fitness
-                    self.global_best_position = particle.position.copy()
+            with self._phase('record'):
+                self.history.record(iteration, self.positions, self.global_best_position)
+            self.iterations_run = iteration + 1
 
-            self.cost_history.append(self.global_best_value)
+            with self._phase('stopping'):
+                reason = self._check_stopping()
+                if reason is not None:
+                    self.stop_reason = reason
 
-            for i, particle in enumerate(self.swarm):
-                target_social = self._get_social_target(i)
-                r1 = np.random.random(self.dim)
-                r2 = np.random.random(self.dim)
+            schedule = self.resolution_schedule
+            if schedule is not None:
+                last = reason is not None or iteration == self.max_iter - 1
+                if schedule.finalize(self) if last else schedule.update(self, iteration):
+                    self._rescore()
+                    if last:
+                        self.cost_history[-1] = self.global_best_value
 
-                cognitive = self.c1 * r1 * (particle.best_position - particle.position)
-                social = self.c2 * r2 * (target_social - particle.position)
+            self._tick()
+            yield PSOSnapshot(iteration, self.global_best_value, self.global_best_position,
+                              self.positions if positions else None, self.evaluations, reason)
+            self._clock = time.perf_counter()
 
-                particle.velocity = (self.w * particle.velocity) + cognitive + social
-                particle.velocity = np.clip(particle.velocity, -self.v_max, self.v_max)
-                particle.position += particle.velocity
+            if reason is None:
+                self._move()
+                if checkpointer is not None:
+                    self._tick()
+                    with self._phase('checkpoint'):
+                        checkpointer.update(self, iteration)
+            if profiler is not None:
+                profiler.iteration_end(self, iteration)
+            if reason is not None:
+                break
 
-                for d in range(self.dim):
-                    particle.position[d] = max(self.bounds[d][0], min(particle.position[d], self.bounds[d][1]))
+        self.history.flush()
+        self._tick()
+        if checkpointer is not None:
+            checkpointer.save(self, finished=True)
+            checkpointer.close()
 
-        return self.global_best_position, self.global_best_value, self.history, self.cost_history
\ No newline at end of file
+    def result(self):
+        return PSOResult(self.global_best_position, self.global_best_value, self.history, self.cost_history,
+                         stop_reason=self.stop_reason, iterations=self.iterations_run,
+                         evaluations=self.evaluations, elapsed=self.elapsed,
+                         profile=self.profiler.summary() if self.profiler is not None else None)
+
+    def optimize(self):
+        for _ in self.steps():
+            pass
+        return self.result()
@@ -0,0 +1,65 @@
+import numpy as np
+
+RECORDER_MODES = ('off', 'decimate', 'best', 'full')
+
+
+class TrajectoryRecorder:
+    def __init__(self, mode='full', every=1, dtype=np.float32, path=None):
+        if mode not in RECORDER_MODES:
+            raise ValueError(f"Unknown recorder mode: {mode}")
+        self.mode = mode
+        self.every = max(1, int(every)) if mode == 'decimate' else 1
+        self.dtype = np.dtype(dtype)
+        self.path = path
+
+        self.frames = None
+        self.iterations = None
+        self.count = 0
+
+    def allocate(self, max_iter, num_particles, dim):
+        # Storage is sized once for the whole run, so memory stays bounded by max_iter;
+        # frames past the capacity are dropped.
+        if self.mode == 'off':
+            capacity, rows = 0, num_particles
+        elif self.mode == 'best':
+            capacity, rows = max_iter, 1
+        else:
+            capacity, rows = -(-max_iter // self.every), num_particles
+
+        shape = (capacity, rows, dim)
+        if self.path is not None and capacity > 0:
+            self.frames = np.lib.format.open_memmap(self.path, mode='w+', dtype=self.dtype, shape=shape)
+        else:
+            self.frames = np.empty(shape, dtype=self.dtype)
+        self.iterations = np.empty(capacity, dtype=np.int64)
+        self.count = 0
+
+    def record(self, iteration, positions, best_position):
+        if self.mode == 'off' or iteration % self.every != 0 or self.count >= len(self.frames):
+            return
+        if self.mode == 'best':
+            self.frames[self.count, 0] = best_position
+        else:
+            self.frames[self.count] = positions
+        self.iterations[self.count] = iteration
+        self.count += 1
+
+    def flush(self):
+        if isinstance(self.frames, np.memmap):
+            self.frames.flush()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.frames[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("frame index out of range")
+        return self.frames[index]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.frames[i]
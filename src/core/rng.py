@@ -0,0 +1,47 @@
+import numpy as np
+
+# Random number sources for PSO runs. `rng` arguments accept:
+#   None                      the global np.random state (legacy: np.random.seed() reproduces runs)
+#   int / SeedSequence        a new PCG64 Generator seeded from it
+#   Generator / RandomState   used as-is
+# Generators are owned by one run, so runs in threads, processes or islands of one process do
+# not disturb each other's draws.
+
+RNG_KINDS = ('legacy', 'pcg64')
+
+
+def resolve_rng(rng=None):
+    if rng is None:
+        return np.random
+    if isinstance(rng, (np.random.Generator, np.random.RandomState)):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def spawn_rngs(seed, count):
+    # `count` statistically independent Generators derived from one seed (None: fresh entropy),
+    # e.g. one per parallel run or island.
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
+
+
+def random_floats(rng, shape, dtype):
+    # Generators draw float32 directly; the legacy RandomState only draws float64.
+    if isinstance(rng, np.random.Generator) and dtype in (np.float32, np.float64):
+        return rng.random(shape, dtype=dtype)
+    return rng.random(shape).astype(dtype, copy=False)
+
+
+def get_rng_state(rng):
+    if isinstance(rng, np.random.Generator):
+        return rng.bit_generator.state
+    return rng.get_state(legacy=False)
+
+
+def set_rng_state(rng, state):
+    if isinstance(rng, np.random.Generator):
+        if state.get('bit_generator') != rng.bit_generator.state['bit_generator']:
+            raise ValueError(f"random state is for {state.get('bit_generator')}, "
+                             f"the generator uses {rng.bit_generator.state['bit_generator']}")
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
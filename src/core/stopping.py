@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+
+# Each criterion is checked once per iteration, after the swarm has been evaluated.
+# check() returns a short reason string when the run should stop, otherwise None.
+# Criteria on the cost itself (`uses_cost`) are only checked at the final fitness resolution:
+# coarse-grid costs are not the costs the run reports (see multiresolution).
+
+
+class TargetCost:
+    uses_cost = True
+
+    def __init__(self, target):
+        self.target = target
+
+    def reset(self, pso):
+        pass
+
+    def check(self, pso):
+        if pso.global_best_value <= self.target:
+            return f"target cost {self.target} reached"
+        return None
+
+
+class StallWindow:
+    uses_cost = True
+
+    def __init__(self, window=20, tol=1e-6):
+        self.window = window
+        self.tol = tol
+
+    def reset(self, pso):
+        pass
+
+    def check(self, pso):
+        # Only costs at the current fitness resolution are comparable (see multiresolution).
+        history = pso.cost_history[pso.level_start:]
+        if len(history) <= self.window:
+            return None
+        if history[-self.window - 1] - history[-1] <= self.tol:
+            return f"no improvement above {self.tol} in {self.window} iterations"
+        return None
+
+
+class DiversityCollapse:
+    uses_cost = False
+
+    def __init__(self, threshold=1e-3):
+        self.threshold = threshold
+
+    def reset(self, pso):
+        span = pso.upper - pso.lower
+        self.span = np.where(span > 0, span, 1.0)
+
+    def check(self, pso):
+        # Spread = mean per-dimension standard deviation, relative to the search range.
+        spread = float(np.mean(np.std(pso.positions, axis=0) / self.span))
+        if spread < self.threshold:
+            return f"swarm diversity {spread:.2e} below {self.threshold}"
+        return None
+
+
+class WallClock:
+    uses_cost = False
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def reset(self, pso):
+        # A resumed run has already spent pso.elapsed seconds of the budget.
+        self.start = time.perf_counter() - pso.elapsed
+
+    def check(self, pso):
+        if time.perf_counter() - self.start >= self.seconds:
+            return f"time budget of {self.seconds}s exhausted"
+        return None
+
+
+class MaxEvaluations:
+    uses_cost = False
+
+    def __init__(self, max_evaluations):
+        self.max_evaluations = max_evaluations
+
+    def reset(self, pso):
+        pass
+
+    def check(self, pso):
+        # Stop before an iteration that would go over the budget. With a resolution schedule,
+        # each refinement still to come re-scores the swarm (see multiresolution), so one
+        # swarm's worth of evaluations is kept back per remaining level.
+        schedule = pso.resolution_schedule
+        pending = 0 if schedule is None else len(schedule.levels) - 1 - schedule.index
+        if pso.evaluations + pso.num_particles * (1 + pending) > self.max_evaluations:
+            return f"evaluation budget of {self.max_evaluations} reached"
+        return None
+
+
+def build_criteria(target_cost=None, stall_window=None, stall_tol=1e-6, min_diversity=None,
+                   max_seconds=None, max_evaluations=None):
+    criteria = []
+    if target_cost is not None:
+        criteria.append(TargetCost(target_cost))
+    if stall_window:
+        criteria.append(StallWindow(stall_window, stall_tol))
+    if min_diversity is not None:
+        criteria.append(DiversityCollapse(min_diversity))
+    if max_seconds is not None:
+        criteria.append(WallClock(max_seconds))
+    if max_evaluations is not None:
+        criteria.append(MaxEvaluations(max_evaluations))
+    return criteria
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Static neighbourhoods as (num_particles, k) index tables. Rows of different degree are
+# padded with the particle's own index, which never changes the argmin over best values.
+
+
+def _pad_rows(rows, num_particles):
+    width = max(len(r) for r in rows)
+    table = np.empty((num_particles, width), dtype=np.intp)
+    for i, r in enumerate(rows):
+        table[i, :len(r)] = r
+        table[i, len(r):] = i
+    return table
+
+
+def ring_neighbors(num_particles, neighbor_size):
+    neighbor_size = max(1, min(neighbor_size, num_particles))
+    start = np.arange(num_particles) - (neighbor_size // 2)
+    return (start[:, np.newaxis] + np.arange(neighbor_size)) % num_particles
+
+
+def von_neumann_neighbors(num_particles):
+    # Particles laid out row-major on a torus of width ceil(sqrt(N)); neighbours are the
+    # cells above, below, left and right. An incomplete last row wraps around its own length
+    # and the columns it does not reach wrap around one row less.
+    cols = int(np.ceil(np.sqrt(num_particles)))
+    rows = -(-num_particles // cols)
+    last = num_particles - (rows - 1) * cols
+    row, col = np.divmod(np.arange(num_particles), cols)
+    row_len = np.where(row == rows - 1, last, cols)
+    col_len = np.where(col < last, rows, rows - 1)
+
+    def index(r, c):
+        return r * cols + c
+
+    return np.stack([
+        index(row, col),
+        index((row - 1) % col_len, col),
+        index((row + 1) % col_len, col),
+        index(row, (col - 1) % row_len),
+        index(row, (col + 1) % row_len),
+    ], axis=1)
+
+
+def random_regular_neighbors(num_particles, neighbor_size, seed=None):
+    # Union of neighbor_size // 2 random Hamiltonian cycles: every particle gets degree
+    # 2 * (neighbor_size // 2) (fewer only when two cycles share an edge). `seed` may also be
+    # a random source with permutation() (a Generator, RandomState or np.random itself).
+    rng = seed if hasattr(seed, 'permutation') else np.random.default_rng(seed)
+    degree = max(1, neighbor_size // 2)
+    rows = [[i] for i in range(num_particles)]
+    for _ in range(degree):
+        order = rng.permutation(num_particles)
+        nxt = np.roll(order, -1)
+        for a, b in zip(order, nxt):
+            rows[a].append(b)
+            rows[b].append(a)
+    return _pad_rows(rows, num_particles)
+
+
+STAR_HUB = 0
+
+
+def star_neighbors(num_particles, hub=STAR_HUB):
+    # Wheel: every particle sees only itself and the hub. The hub sees the whole swarm; its
+    # row is just itself here (a full row would pad the table to N x N), and PSO gives it the
+    # swarm's best instead.
+    table = np.empty((num_particles, 2), dtype=np.intp)
+    table[:, 0] = np.arange(num_particles)
+    table[:, 1] = hub
+    return table
+
+
+def build_neighbor_table(topology, num_particles, neighbor_size, seed=None):
+    if topology == 'social':
+        return ring_neighbors(num_particles, neighbor_size)
+    if topology == 'von_neumann':
+        return von_neumann_neighbors(num_particles)
+    if topology == 'random':
+        return random_regular_neighbors(num_particles, neighbor_size, seed)
+    if topology == 'star':
+        return star_neighbors(num_particles)
+    return None
+
+
+STATIC_TOPOLOGIES = ('social', 'von_neumann', 'random', 'star')
+TOPOLOGIES = ('global', 'geographic') + STATIC_TOPOLOGIES
@@ -0,0 +1,153 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from src.problems.propagation import wall_crossings, wall_factors
+
+FIELD_CACHE_SIZE = 32
+
+
+# Scratch memory the coverage kernel may use per call, whatever the grid or swarm size.
+COVERAGE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class CoverageKernel:
+    # Counts uncovered grid points for a batch of router layouts in tiles of particles x grid
+    # points sized to `max_bytes`. Each tile keeps a running minimum of the (wall-attenuated)
+    # squared distance over the routers in preallocated scratch buffers, so peak memory does
+    # not grow with the grid resolution or the swarm size. Buffers are per thread, so one
+    # kernel can serve a ThreadEvaluator.
+    def __init__(self, grid_points, r_sq, wall_model=None, max_bytes=COVERAGE_MAX_BYTES):
+        self.grid_points = np.ascontiguousarray(grid_points)
+        self.dtype = self.grid_points.dtype
+        # Column-major copy so every axis of a grid tile is a contiguous slice.
+        self.grid_axes = np.ascontiguousarray(self.grid_points.T)
+        self.r_sq = r_sq
+        self.wall_model = wall_model
+        self.factor_table = None
+        if wall_model is not None:
+            self.factor_table = wall_model.factor_table.astype(self.dtype)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def tile_shape(self, n):
+        # Bytes per tile element: running minimum, distance and temporary (dtype), plus the wall
+        # counts and an intp index scratch, used both by the wall model's table lookups and to
+        # look up the wall factors (np.take would otherwise make an intp copy of the counts).
+        per_element = 3 * self.dtype.itemsize + (1 + np.dtype(np.intp).itemsize if self.wall_model is not None else 1)
+        elements = max(1, self.max_bytes // per_element)
+        grid_tile = min(len(self.grid_points), elements)
+        return max(1, min(n, elements // grid_tile)), grid_tile
+
+    def _buffers(self, shape):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].shape[0] < shape[0] or buffers[0].shape[1] < shape[1]:
+            buffers = tuple(np.empty(shape, dtype=self.dtype) for _ in range(3)) + (np.empty(shape, dtype=np.uint8),)
+            if self.wall_model is not None:
+                buffers += (np.empty(shape, dtype=np.intp),)
+            self._local.buffers = buffers
+        return buffers
+
+    def uncovered_counts(self, routers):
+        # routers: (N, R, dim) -> (N,) grid points farther than sqrt(r_sq) from every router.
+        routers = np.asarray(routers, dtype=self.dtype)
+        n, n_routers, dim = routers.shape
+        counts = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return counts
+
+        particle_tile, grid_tile = self.tile_shape(n)
+        nearest_buf, dist_buf, tmp_buf, walls_buf, *index_buf = self._buffers((particle_tile, grid_tile))
+        for p0 in range(0, n, particle_tile):
+            p1 = min(n, p0 + particle_tile)
+            for g0 in range(0, len(self.grid_points), grid_tile):
+                g1 = min(len(self.grid_points), g0 + grid_tile)
+                nearest = nearest_buf[:p1 - p0, :g1 - g0]
+                dist = dist_buf[:p1 - p0, :g1 - g0]
+                tmp = tmp_buf[:p1 - p0, :g1 - g0]
+                for r in range(n_routers):
+                    target = nearest if r == 0 else dist
+                    for axis in range(dim):
+                        out = target if axis == 0 else tmp
+                        np.subtract(self.grid_axes[axis, np.newaxis, g0:g1], routers[p0:p1, r, axis:axis + 1], out=out)
+                        np.multiply(out, out, out=out)
+                        if axis:
+                            target += tmp
+                    if self.wall_model is not None:
+                        index = index_buf[0][:p1 - p0, :g1 - g0]
+                        walls = self.wall_model.crossings(routers[p0:p1, r], g0, g1, walls_buf[:p1 - p0, :g1 - g0],
+                                                          index)
+                        np.copyto(index, walls)
+                        np.take(self.factor_table, index, out=tmp, mode='clip')
+                        target *= tmp
+                    if r:
+                        np.minimum(nearest, dist, out=nearest)
+                uncovered = np.greater(nearest, self.r_sq, out=walls_buf[:p1 - p0, :g1 - g0].view(bool))
+                counts[p0:p1] += uncovered.sum(axis=1)
+        return counts
+
+
+def uncovered_counts(grid_points, routers, r_sq, wall_model=None, max_bytes=COVERAGE_MAX_BYTES):
+    # grid_points: (G, dim), routers: (N, R, dim) -> (N,) number of grid points farther
+    # than sqrt(r_sq) from every router of each candidate layout. With a wall model the
+    # squared distances are scaled by the wall attenuation between router and point.
+    # Problems evaluated repeatedly should keep a CoverageKernel to reuse its buffers.
+    grid_points = np.asarray(grid_points)
+    dtype = np.result_type(grid_points, routers)
+    return CoverageKernel(grid_points.astype(dtype, copy=False), r_sq, wall_model, max_bytes).uncovered_counts(routers)
+
+
+def min_distance_field(routers, extent, resolution, boxes=None, wall_loss_db=0.0, path_loss_exponent=3.0):
+    # Distance to the nearest router on a regular (ny, nx) grid over extent = (x0, x1, y0, y1).
+    # Without walls the grid is separable, so each router costs one outer sum instead of a
+    # norm per cell. With walls the distance is the wall-attenuated effective distance.
+    nx, ny = (resolution, resolution) if np.isscalar(resolution) else resolution
+    xs = np.linspace(extent[0], extent[1], nx)
+    ys = np.linspace(extent[2], extent[3], ny)
+    routers = np.asarray(routers, dtype=float).reshape(-1, 2)
+
+    if boxes is not None and len(boxes) and wall_loss_db > 0:
+        gx, gy = np.meshgrid(xs, ys)
+        cells = np.column_stack((gx.ravel(), gy.ravel()))
+        factors = wall_factors(wall_crossings(routers, cells, boxes), wall_loss_db, path_loss_exponent)
+        min_sq = np.full(cells.shape[0], np.inf)
+        for r, (rx, ry) in enumerate(routers):
+            np.minimum(min_sq, ((cells[:, 0] - rx) ** 2 + (cells[:, 1] - ry) ** 2) * factors[r], out=min_sq)
+        return np.sqrt(min_sq).reshape(ny, nx)
+
+    min_sq = np.full((ny, nx), np.inf)
+    for rx, ry in routers:
+        np.minimum(min_sq, (ys[:, np.newaxis] - ry) ** 2 + (xs[np.newaxis, :] - rx) ** 2, out=min_sq)
+    return np.sqrt(min_sq)
+
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _cached_signal_field(routers, radius, extent, resolution, boxes, wall_loss_db, path_loss_exponent):
+    boxes = np.array(boxes, dtype=float).reshape(-1, 2, 2) if boxes else None
+    dist = min_distance_field(routers, extent, resolution, boxes, wall_loss_db, path_loss_exponent)
+    field = np.where(dist < radius, 1 - dist / radius, 0.0)
+    field.flags.writeable = False
+    return field
+
+
+def signal_field(routers, radius, extent=(0, 100, 0, 100), resolution=100, boxes=None, wall_loss_db=0.0,
+                 path_loss_exponent=3.0):
+    # Normalised signal strength (1 at a router, 0 at and beyond the effective `radius`),
+    # cached on the router layout so redrawing the same result is free. The returned array
+    # is read-only. `boxes` are 2D walls as returned by propagation.rect_boxes.
+    key = tuple(np.round(np.asarray(routers, dtype=float).ravel(), 9))
+    if not np.isscalar(resolution):
+        resolution = tuple(resolution)
+    boxes_key = tuple(np.asarray(boxes, dtype=float).ravel()) if boxes is not None else ()
+    return _cached_signal_field(key, float(radius), tuple(extent), resolution, boxes_key,
+                                float(wall_loss_db), float(path_loss_exponent))
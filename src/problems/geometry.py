@@ -0,0 +1,160 @@
+import numpy as np
+
+# Below this many obstacles the dense segment x obstacle test beats the broad phase.
+BROAD_PHASE_MIN_OBSTACLES = 32
+# Largest (boxes x items) table candidate_pairs deduplicates with a mark array instead of a sort.
+DEDUPE_MARK_LIMIT = 1 << 26
+
+
+# Exact segment vs circle (2D) / sphere (3D) test. p1, p2: (..., dim), centers: (K, dim),
+# radii: (K,) -> bool (..., K). Zero-length segments are tested as points.
+def segment_sphere_hits(p1, p2, centers, radii):
+    return _segment_sphere_test(p1[..., np.newaxis, :], p2[..., np.newaxis, :], centers, radii)
+
+
+def _segment_sphere_test(p1, p2, centers, radii):
+    # Elementwise version: all arguments broadcast against each other.
+    d_vec = p2 - p1
+    f_vec = p1 - centers
+
+    d2 = np.sum(d_vec * d_vec, axis=-1)
+    proj = -np.sum(f_vec * d_vec, axis=-1)
+    t = np.divide(proj, d2, out=np.zeros_like(proj), where=d2 > 0)
+    t = np.clip(t, 0, 1)
+
+    closest = f_vec + t[..., np.newaxis] * d_vec
+    dist_sq = np.sum(closest * closest, axis=-1)
+
+    return dist_sq < radii ** 2
+
+
+class UniformGrid:
+    # Broad-phase acceleration structure: a regular grid of `shape` cells of size `cell_size`
+    # starting at `lower`, with the items overlapping each cell stored CSR-style: the items of
+    # flat cell c are items[starts[c]:starts[c + 1]].
+    def __init__(self, lower, cell_size, shape, starts, items):
+        self.lower = np.asarray(lower, dtype=float)
+        self.cell_size = np.asarray(cell_size, dtype=float)
+        self.shape = tuple(int(n) for n in shape)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.items = np.asarray(items, dtype=np.int32)
+
+    def candidate_pairs(self, lo, hi, owner=None):
+        # (box, item) index pairs, without duplicates, for every item bucketed in a cell that
+        # the boxes [lo, hi] (B, dim) overlap. Boxes over empty cells yield nothing. With
+        # `owner` (B,), pairs are reported per owner instead of per box.
+        first, final = self.cell_range(lo, hi)
+        extent = final - first + 1
+        box, offset = _expand_ranges(np.prod(extent, axis=1))
+        cell = np.zeros(box.size, dtype=np.int64)
+        stride = 1
+        for d in reversed(range(len(self.shape))):
+            cell += (first[box, d] + offset % extent[box, d]) * stride
+            offset //= extent[box, d]
+            stride *= self.shape[d]
+
+        pair, local = _expand_ranges(self.starts[cell + 1] - self.starts[cell])
+        items = self.items[self.starts[cell[pair]] + local]
+        n_items = int(self.items.max()) + 1 if self.items.size else 1
+        box = box[pair] if owner is None else owner[box[pair]]
+        n_owners = len(lo) if owner is None else int(owner.max()) + 1 if len(owner) else 0
+        keys = box * n_items + items
+        if n_owners * n_items <= DEDUPE_MARK_LIMIT:
+            # A mark per possible pair is much cheaper than sorting the candidates.
+            mark = np.zeros(n_owners * n_items, dtype=bool)
+            mark[keys] = True
+            keys = np.flatnonzero(mark)
+        else:
+            keys = np.unique(keys)
+        return keys // n_items, keys % n_items
+
+    def cell_range(self, lo, hi):
+        # Inclusive per-axis cell index ranges covering the boxes [lo, hi] (..., dim).
+        last = np.array(self.shape) - 1
+        first = np.clip(np.floor((lo - self.lower) / self.cell_size).astype(np.int64), 0, last)
+        final = np.clip(np.floor((hi - self.lower) / self.cell_size).astype(np.int64), 0, last)
+        return first, final
+
+
+def _expand_ranges(lengths):
+    # For consecutive ranges of the given lengths: the range of every element and its position
+    # inside that range.
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    return owners, np.arange(owners.size) - starts[owners]
+
+
+def segment_sphere_hit_counts(p1, p2, centers, radii, grid=None):
+    # Number of circles / spheres each segment hits, (...,). With a UniformGrid over the
+    # obstacles (see obstacle_grid) only the obstacles sharing a cell with a segment's bounding
+    # box get the exact test, so the cost follows the local obstacle density.
+    if grid is None:
+        return np.sum(segment_sphere_hits(p1, p2, centers, radii), axis=-1)
+    dim = p1.shape[-1]
+    a = p1.reshape(-1, dim)
+    b = p2.reshape(-1, dim)
+
+    # Long segments are queried as pieces about one cell long, so a diagonal does not pull in
+    # every obstacle of its (large) bounding box. Pieces are padded slightly against rounding.
+    pieces = np.max(np.ceil(np.abs(b - a) / grid.cell_size), axis=1).astype(np.int64)
+    owner, k = _expand_ranges(np.maximum(pieces, 1))
+    n = np.maximum(pieces, 1)[owner][:, np.newaxis]
+    start = a[owner] + (b[owner] - a[owner]) * (k[:, np.newaxis] / n)
+    end = a[owner] + (b[owner] - a[owner]) * ((k[:, np.newaxis] + 1) / n)
+    pad = 1e-6 * grid.cell_size
+    segment, obstacle = grid.candidate_pairs(np.minimum(start, end) - pad, np.maximum(start, end) + pad, owner)
+    hits = _segment_sphere_test(a[segment], b[segment], centers[obstacle], radii[obstacle])
+    return np.bincount(segment[hits], minlength=len(a)).reshape(p1.shape[:-1])
+
+
+def build_obstacle_grid(centers, radii, lower, upper):
+    # Broad-phase grid for segment_sphere_hit_counts, or None when there are too few obstacles
+    # for it to pay off.
+    if len(radii) < BROAD_PHASE_MIN_OBSTACLES:
+        return None
+    return build_uniform_grid(sphere_boxes(centers, radii), lower, upper)
+
+
+def sphere_boxes(centers, radii):
+    # Axis-aligned bounding boxes (K, 2, dim) of circles / spheres.
+    centers = np.asarray(centers, dtype=float)
+    radii = np.asarray(radii, dtype=float)[:, np.newaxis]
+    return np.stack([centers - radii, centers + radii], axis=1)
+
+
+def build_uniform_grid(boxes, lower, upper, items_per_cell=2.0):
+    # Buckets axis-aligned boxes (K, 2, dim) into a uniform grid over [lower, upper] with about
+    # `items_per_cell` boxes per occupied cell.
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 2, len(lower))
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    dim = len(lower)
+    extent = np.maximum(upper - lower, 1e-9)
+
+    n_cells = max(1.0, len(boxes) / items_per_cell)
+    cell = float((np.prod(extent) / n_cells) ** (1.0 / dim))
+    # Cells smaller than a typical box only duplicate the box into more buckets.
+    if len(boxes):
+        cell = max(cell, float(np.median(np.max(boxes[:, 1] - boxes[:, 0], axis=1))))
+    shape = np.maximum(1, np.ceil(extent / cell)).astype(np.int64)
+    cell_size = extent / shape
+
+    grid = UniformGrid(lower, cell_size, shape, np.zeros(int(np.prod(shape)) + 1, dtype=np.int64),
+                       np.zeros(0, dtype=np.int32))
+    if len(boxes) == 0:
+        return grid
+
+    first, final = grid.cell_range(boxes[:, 0], boxes[:, 1])
+    cells, owners = [], []
+    for k in range(len(boxes)):
+        axes = [np.arange(first[k, d], final[k, d] + 1) for d in range(dim)]
+        index = np.ravel_multi_index(tuple(a.ravel() for a in np.meshgrid(*axes, indexing='ij')), grid.shape)
+        cells.append(index)
+        owners.append(np.full(index.size, k, dtype=np.int32))
+    cells = np.concatenate(cells)
+    owners = np.concatenate(owners)
+
+    order = np.argsort(cells, kind='stable')
+    grid.items = owners[order]
+    grid.starts[1:] = np.cumsum(np.bincount(cells, minlength=int(np.prod(shape))))
+    return grid
@@ -1,62 +1,69 @@
 import numpy as np
 
+from src.problems.geometry import BROAD_PHASE_MIN_OBSTACLES, build_obstacle_grid, segment_sphere_hit_counts
+
 class PathfindingProblem3D:
-    def __init__(self, start_pos, end_pos, num_waypoints):
-        self.start = np.array(start_pos)
-        self.end = np.array(end_pos)
+    def __init__(self, start_pos, end_pos, num_waypoints, dtype=np.float64, obstacles=None, area=(100, 100, 100),
+                 obstacle_grid=None):
+        self.dtype = np.dtype(dtype)
+        self.start = np.array(start_pos, dtype=self.dtype)
+        self.end = np.array(end_pos, dtype=self.dtype)
         self.num_waypoints = num_waypoints
-
-        self.obstacles = [
-            (50, 50, 50, 20),
-            (20, 20, 20, 15),
-            (80, 80, 80, 15),
-            (20, 80, 50, 10)
-        ]
+        self.width, self.depth, self.height = area
+
+        if obstacles is None:
+            obstacles = [
+                (50, 50, 50, 20),
+                (20, 20, 20, 15),
+                (80, 80, 80, 15),
+                (20, 80, 50, 10)
+            ]
+        self.obstacles = [tuple(o) for o in obstacles]
+        self.obstacle_array = np.array(self.obstacles, dtype=self.dtype).reshape(-1, 4)
+        # Broad phase for large obstacle sets (None: every segment is tested against every obstacle).
+        if obstacle_grid is None:
+            obstacle_grid = build_obstacle_grid(self.obstacle_array[:, :3], self.obstacle_array[:, 3],
+                                                np.zeros(3), area)
+        self.obstacle_grid = obstacle_grid
+
+    @classmethod
+    def from_scene(cls, scene, num_waypoints, **options):
+        if scene.dim != 3:
+            raise ValueError(f"{cls.__name__} needs a 3D scene, got {scene.dim}D")
+        grid = scene.obstacle_grid if len(scene.obstacles) >= BROAD_PHASE_MIN_OBSTACLES else None
+        return cls(scene.start, scene.end, num_waypoints, obstacles=scene.obstacles.tolist(),
+                   area=scene.size.tolist(), obstacle_grid=grid, **options)
 
     def get_bounds(self):
         bounds = []
         for _ in range(self.num_waypoints):
-            bounds.append((0, 100))
-            bounds.append((0, 100))
-            bounds.append((0, 100))
+            bounds.append((0, self.width))
+            bounds.append((0, self.depth))
+            bounds.append((0, self.height))
         return bounds
 
-    def _check_collision(self, p1, p2):
-        for (ox, oy, oz, r) in self.obstacles:
-            obstacle_center = np.array([ox, oy, oz])
-
-            d_vec = p2 - p1
-            f_vec = p1 - obstacle_center
-
-            d2 = np.dot(d_vec, d_vec)
-            if d2 == 0: continue
-
-            t = -np.dot(f_vec, d_vec) / d2
-            t = np.clip(t, 0, 1)
+    def _segment_collisions(self, p1, p2):
+        hits = segment_sphere_hit_counts(p1, p2, self.obstacle_array[:, :3], self.obstacle_array[:, 3],
+                                         self.obstacle_grid)
+        return hits > 0
 
-            closest_point = p1 + t * d_vec
-            distance = np.linalg.norm(closest_point - obstacle_center)
-
-            if distance < r:
-                return True
-        return False
+    def _full_paths(self, positions):
+        n = positions.shape[0]
+        waypoints = np.asarray(positions, dtype=self.dtype).reshape((n, self.num_waypoints, 3))
+        start = np.broadcast_to(self.start, (n, 1, 3))
+        end = np.broadcast_to(self.end, (n, 1, 3))
+        return np.concatenate([start, waypoints, end], axis=1)
 
     def fitness_function(self, particle_position):
-        waypoints = particle_position.reshape((self.num_waypoints, 3))
-
-        full_path = [self.start] + list(waypoints) + [self.end]
-
-        total_distance = 0
-        penalty = 0
-
-        for i in range(len(full_path) - 1):
-            p1 = np.array(full_path[i])
-            p2 = np.array(full_path[i + 1])
+        return self.fitness_batch(particle_position[np.newaxis, :])[0]
 
-            dist = np.linalg.norm(p2 - p1)
-            total_distance += dist
+    def fitness_batch(self, positions):
+        full_path = self._full_paths(positions)
+        p1 = full_path[:, :-1, :]
+        p2 = full_path[:, 1:, :]
 
-            if self._check_collision(p1, p2):
-                penalty += 1000
+        # Segment lengths in the problem dtype, summed in float64.
+        total_distance = np.sum(np.linalg.norm(p2 - p1, axis=2), axis=1, dtype=np.float64)
+        penalty = 1000 * np.sum(self._segment_collisions(p1, p2), axis=1)
 
-        return total_distance + penalty
\ No newline at end of file
+        return total_distance + penalty
@@ -1,23 +1,61 @@
 import numpy as np
 
+from src.problems.coverage import COVERAGE_MAX_BYTES, CoverageKernel
+from src.problems.propagation import WallModel, rect_boxes
+
 
 class WifiProblem:
-    def __init__(self, room_size=(100, 100), n_routers=3, signal_radius=30):
+    def __init__(self, room_size=(100, 100), n_routers=3, signal_radius=30,
+                 wall_loss_db=5.0, path_loss_exponent=3.0, visibility_lattice=41, exact_visibility=False,
+                 grid_resolution=50, dtype=np.float64, coverage_bytes=COVERAGE_MAX_BYTES, walls=None):
         self.width, self.height = room_size
         self.n_routers = n_routers
+        self.dtype = np.dtype(dtype)
         self.radius = signal_radius
 
-        self.walls = [
-            (40, 0, 5, 60),
-            (40, 80, 5, 20),
-            (0, 50, 30, 5)
-        ]
+        if walls is None:
+            walls = [
+                (40, 0, 5, 60),
+                (40, 80, 5, 20),
+                (0, 50, 30, 5)
+            ]
+        self.walls = [tuple(w) for w in walls]
+
+        self.wall_loss_db = wall_loss_db
+        self.path_loss_exponent = path_loss_exponent
+        self.visibility_lattice = visibility_lattice
+        self.exact_visibility = exact_visibility
+        self.coverage_bytes = coverage_bytes
+        self.wall_boxes = rect_boxes(self.walls)
+
+        self.set_resolution(grid_resolution)
 
-        x = np.linspace(0, self.width, 50)
-        y = np.linspace(0, self.height, 50)
+    @classmethod
+    def from_scene(cls, scene, n_routers, **options):
+        if scene.dim != 2:
+            raise ValueError(f"{cls.__name__} needs a 2D scene, got {scene.dim}D")
+        settings = {'room_size': tuple(scene.size.tolist()), 'walls': scene.walls.tolist()}
+        if scene.grid_resolution is not None:
+            settings['grid_resolution'] = scene.grid_resolution
+        if scene.signal_radius is not None:
+            settings['signal_radius'] = scene.signal_radius
+        settings.update(options)
+        return cls(n_routers=n_routers, **settings)
+
+    def set_resolution(self, grid_resolution):
+        self.grid_resolution = grid_resolution
+        x = np.linspace(0, self.width, grid_resolution)
+        y = np.linspace(0, self.height, grid_resolution)
         self.grid_x, self.grid_y = np.meshgrid(x, y)
 
-        self.grid_points = np.column_stack((self.grid_x.ravel(), self.grid_y.ravel()))
+        self.grid_points = np.column_stack((self.grid_x.ravel(), self.grid_y.ravel())).astype(self.dtype)
+
+        self.wall_model = None
+        if self.wall_loss_db > 0 and len(self.walls):
+            self.wall_model = WallModel(self.wall_boxes, self.grid_points, (0, 0), (self.width, self.height),
+                                        self.wall_loss_db, self.path_loss_exponent, self.visibility_lattice,
+                                        self.exact_visibility, self.dtype)
+        self.coverage = CoverageKernel(self.grid_points, self.radius ** 2, self.wall_model, self.coverage_bytes)
 
     def get_bounds(self):
         bounds = []
@@ -27,12 +65,8 @@ class WifiProblem:
         return bounds
 
     def fitness_function(self, particle_position):
-        routers = particle_position.reshape((self.n_routers, 2))
-        diff = self.grid_points[:, np.newaxis, :] - routers[np.newaxis, :, :]
-
-        dists_sq = np.sum(diff ** 2, axis=2)
+        return self.fitness_batch(particle_position[np.newaxis, :])[0]
 
-        r_sq = self.radius ** 2
-        min_dists_sq = np.min(dists_sq, axis=1)
-        uncovered_count = np.sum(min_dists_sq > r_sq)
-        return uncovered_count
\ No newline at end of file
+    def fitness_batch(self, positions):
+        routers = np.asarray(positions, dtype=self.dtype).reshape((positions.shape[0], self.n_routers, 2))
+        return self.coverage.uncovered_counts(routers)
@@ -1,18 +1,51 @@
 import numpy as np
 
+from src.problems.coverage import COVERAGE_MAX_BYTES, CoverageKernel
+from src.problems.propagation import WallModel, cuboid_boxes
+
 class WifiProblem3D:
-    def __init__(self, room_size=(100, 100, 100), n_routers=3, signal_radius=35):
+    def __init__(self, room_size=(100, 100, 100), n_routers=3, signal_radius=35,
+                 wall_loss_db=5.0, path_loss_exponent=3.0, visibility_lattice=11, exact_visibility=False,
+                 grid_resolution=20, dtype=np.float64, coverage_bytes=COVERAGE_MAX_BYTES, walls=None):
         self.width, self.depth, self.height = room_size
         self.n_routers = n_routers
+        self.dtype = np.dtype(dtype)
         self.radius = signal_radius
 
-        self.walls = [
-            (45, 55, 0, 60, 0, 100)
-        ]
+        if walls is None:
+            walls = [
+                (45, 55, 0, 60, 0, 100)
+            ]
+        self.walls = [tuple(w) for w in walls]
+
+        self.r_sq = self.radius ** 2
+
+        self.wall_loss_db = wall_loss_db
+        self.path_loss_exponent = path_loss_exponent
+        self.visibility_lattice = visibility_lattice
+        self.exact_visibility = exact_visibility
+        self.coverage_bytes = coverage_bytes
+        self.wall_boxes = cuboid_boxes(self.walls)
 
-        x = np.linspace(0, self.width, 20)
-        y = np.linspace(0, self.depth, 20)
-        z = np.linspace(0, self.height, 20)
+        self.set_resolution(grid_resolution)
+
+    @classmethod
+    def from_scene(cls, scene, n_routers, **options):
+        if scene.dim != 3:
+            raise ValueError(f"{cls.__name__} needs a 3D scene, got {scene.dim}D")
+        settings = {'room_size': tuple(scene.size.tolist()), 'walls': scene.walls.tolist()}
+        if scene.grid_resolution is not None:
+            settings['grid_resolution'] = scene.grid_resolution
+        if scene.signal_radius is not None:
+            settings['signal_radius'] = scene.signal_radius
+        settings.update(options)
+        return cls(n_routers=n_routers, **settings)
+
+    def set_resolution(self, grid_resolution):
+        self.grid_resolution = grid_resolution
+        x = np.linspace(0, self.width, grid_resolution)
+        y = np.linspace(0, self.depth, grid_resolution)
+        z = np.linspace(0, self.height, grid_resolution)
 
         self.grid_x, self.grid_y, self.grid_z = np.meshgrid(x, y, z)
 
@@ -20,9 +53,15 @@ class WifiProblem3D:
             self.grid_x.ravel(),
             self.grid_y.ravel(),
             self.grid_z.ravel()
-        ))
+        )).astype(self.dtype)
 
-        self.r_sq = self.radius ** 2
+        self.wall_model = None
+        if self.wall_loss_db > 0 and len(self.walls):
+            self.wall_model = WallModel(self.wall_boxes, self.grid_points, (0, 0, 0),
+                                        (self.width, self.depth, self.height),
+                                        self.wall_loss_db, self.path_loss_exponent, self.visibility_lattice,
+                                        self.exact_visibility, self.dtype)
+        self.coverage = CoverageKernel(self.grid_points, self.r_sq, self.wall_model, self.coverage_bytes)
 
     def get_bounds(self):
         bounds = []
@@ -33,13 +72,8 @@ class WifiProblem3D:
         return bounds
 
     def fitness_function(self, particle_position):
-        routers = particle_position.reshape((self.n_routers, 3))
-        covered_mask = np.zeros(self.grid_points.shape[0], dtype=bool)
-        for router in routers:
-            diff = self.grid_points - router
-            dists_sq = np.sum(diff ** 2, axis=1)
-
-            covered_mask |= (dists_sq <= self.r_sq)
-        uncovered_count = np.sum(~covered_mask)
+        return self.fitness_batch(particle_position[np.newaxis, :])[0]
 
-        return uncovered_count
\ No newline at end of file
+    def fitness_batch(self, positions):
+        routers = np.asarray(positions, dtype=self.dtype).reshape((positions.shape[0], self.n_routers, 3))
+        return self.coverage.uncovered_counts(routers)
@@ -0,0 +1,144 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Log-distance path loss with a fixed loss per wall crossed:
+#     PL(d) = PL(d0) + 10 * n * log10(d / d0) + k * wall_loss_db
+# The link budget is calibrated so that with no walls the coverage radius is the problem's
+# `signal_radius`. A point is then covered when d^2 * 10^(k * wall_loss_db / (5 * n)) <= r^2,
+# i.e. every wall shrinks the effective radius by 10^(-wall_loss_db / (10 * n)).
+
+CHUNK_ELEMENTS = 1 << 16
+
+# Largest router-lattice x target visibility table WallModel keeps (uint8, one byte per pair).
+WALL_TABLE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def rect_boxes(walls):
+    # 2D walls (x, y, w, h) -> (W, 2, 2) array of [lo, hi] corners.
+    walls = np.asarray(walls, dtype=float).reshape(-1, 4)
+    return np.stack([walls[:, 0:2], walls[:, 0:2] + walls[:, 2:4]], axis=1)
+
+
+def cuboid_boxes(walls):
+    # 3D walls (x0, x1, y0, y1, z0, z1) -> (W, 2, 3) array of [lo, hi] corners.
+    walls = np.asarray(walls, dtype=float).reshape(-1, 6)
+    return np.stack([walls[:, 0::2], walls[:, 1::2]], axis=1)
+
+
+def wall_crossings(sources, targets, boxes):
+    # Number of axis-aligned boxes crossed by every source -> target segment (slab test).
+    # sources: (S, dim), targets: (G, dim), boxes: (W, 2, dim) -> (S, G) uint8.
+    sources = np.asarray(sources, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    counts = np.zeros((sources.shape[0], targets.shape[0]), dtype=np.uint8)
+    if len(boxes) == 0:
+        return counts
+
+    dim = targets.shape[1]
+    step = max(1, CHUNK_ELEMENTS // max(1, targets.shape[0]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, sources.shape[0], step):
+            a = sources[start:start + step, np.newaxis, :]
+            # Per-axis inverse direction; axes the segment runs parallel to give +-inf, which
+            # makes the slab test below either ignore that axis or reject the segment.
+            inv = [1.0 / (targets[np.newaxis, :, k] - a[:, :, k]) for k in range(dim)]
+            for lo, hi in boxes:
+                t_enter = None
+                for k in range(dim):
+                    t1 = (lo[k] - a[:, :, k]) * inv[k]
+                    t2 = (hi[k] - a[:, :, k]) * inv[k]
+                    near = np.fmin(t1, t2)
+                    far = np.fmax(t1, t2)
+                    if t_enter is None:
+                        t_enter, t_exit = near, far
+                    else:
+                        np.fmax(t_enter, near, out=t_enter)
+                        np.fmin(t_exit, far, out=t_exit)
+                counts[start:start + step] += (t_enter <= t_exit) & (t_exit >= 0) & (t_enter <= 1)
+    return counts
+
+
+def lattice_nodes(lower, upper, lattice):
+    # Nodes of a regular lattice with `lattice` points per axis, (lattice^dim, dim), row-major.
+    axes = [np.linspace(lo, hi, lattice) for lo, hi in zip(lower, upper)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+
+
+def lattice_index(points, lower, upper, lattice):
+    # Flat index of the lattice node nearest to each point.
+    span = np.where(upper > lower, upper - lower, 1.0)
+    cell = np.rint((points - lower) / span * (lattice - 1)).astype(np.intp)
+    np.clip(cell, 0, lattice - 1, out=cell)
+    return np.ravel_multi_index(tuple(cell.T), (lattice,) * points.shape[1])
+
+
+# Tables are at most WALL_TABLE_MAX_BYTES each, so the cache holds at most 4 times that.
+@lru_cache(maxsize=4)
+def _lattice_crossings(boxes_key, targets_key, lower, upper, lattice):
+    boxes = np.frombuffer(boxes_key[0]).reshape(boxes_key[1])
+    targets = np.frombuffer(targets_key[0]).reshape(targets_key[1])
+    counts = wall_crossings(lattice_nodes(lower, upper, lattice), targets, boxes)
+    counts.flags.writeable = False
+    return counts
+
+
+def wall_factors(crossings, wall_loss_db, path_loss_exponent):
+    return 10.0 ** (crossings * (wall_loss_db / (5.0 * path_loss_exponent)))
+
+
+class WallModel:
+    def __init__(self, boxes, grid_points, lower, upper, wall_loss_db=5.0, path_loss_exponent=3.0,
+                 lattice=41, exact=False, dtype=np.float64, table_bytes=WALL_TABLE_MAX_BYTES):
+        self.boxes = np.ascontiguousarray(boxes, dtype=float)
+        self.grid_points = np.ascontiguousarray(grid_points, dtype=float)
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.wall_loss_db = wall_loss_db
+        self.path_loss_exponent = path_loss_exponent
+        self.lattice = lattice
+        self.exact = exact
+
+        # Geometry is kept in float64; only the factors applied to the distances follow `dtype`.
+        self.factor_table = wall_factors(np.arange(len(self.boxes) + 1), wall_loss_db,
+                                         path_loss_exponent).astype(dtype)
+
+        # Visibility cache: walls crossed between every node of a regular router lattice and
+        # every grid point, computed once (and shared between problems with the same geometry).
+        # Routers are snapped to the nearest lattice node when looking up their wall counts.
+        # Grids too fine for a WALL_TABLE_MAX_BYTES table are snapped the same way to a
+        # coarser point lattice (`point_index`), so the table stays bounded.
+        self.lattice_counts = None
+        self.point_lattice = None
+        self.point_index = None
+        if not exact:
+            dim = self.grid_points.shape[1]
+            nodes = lattice ** dim
+            targets = self.grid_points
+            if nodes * len(self.grid_points) > table_bytes:
+                self.point_lattice = max(2, int((table_bytes // nodes) ** (1.0 / dim)))
+                targets = lattice_nodes(self.lower, self.upper, self.point_lattice)
+                self.point_index = lattice_index(self.grid_points, self.lower, self.upper, self.point_lattice)
+            self.lattice_counts = _lattice_crossings(
+                (self.boxes.tobytes(), self.boxes.shape), (targets.tobytes(), targets.shape),
+                tuple(self.lower), tuple(self.upper), lattice)
+
+    def _lattice_index(self, routers):
+        return lattice_index(routers, self.lower, self.upper, self.lattice)
+
+    def crossings(self, routers, start=0, stop=None, out=None, index=None):
+        # routers: (N, dim) -> (N, G) walls between each router and each grid point, or only
+        # the grid points [start:stop]. `index` is optional intp scratch of the output's shape.
+        if self.exact:
+            counts = wall_crossings(routers, self.grid_points[start:stop], self.boxes)
+            if out is None:
+                return counts
+            out[...] = counts
+            return out
+        # mode='clip' lets np.take write straight into `out` (indices are already in range).
+        if self.point_index is None:
+            return np.take(self.lattice_counts[:, start:stop], self._lattice_index(routers), axis=0, out=out,
+                           mode='clip')
+        rows = self._lattice_index(routers)[:, np.newaxis] * self.lattice_counts.shape[1]
+        flat = np.add(rows, self.point_index[np.newaxis, start:stop], out=index)
+        return np.take(self.lattice_counts.ravel(), flat, out=out, mode='clip')
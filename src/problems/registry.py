@@ -0,0 +1,35 @@
+from src.problems.problem_pathfinding import PathfindingProblem
+from src.problems.problem_pathfinding_3d import PathfindingProblem3D
+from src.problems.problem_wifi import WifiProblem
+from src.problems.problem_wifi_3d import WifiProblem3D
+from src.problems.scene import Scene, load_scene
+
+# Same scenarios as the desktop app: `complexity` is the number of waypoints for
+# pathfinding and the number of routers for Wi-Fi.
+PROBLEMS = {
+    'pathfinding_2d': lambda complexity, **options: PathfindingProblem((5, 5), (95, 95), complexity, **options),
+    'pathfinding_3d': lambda complexity, **options: PathfindingProblem3D((5, 5, 5), (95, 95, 95), complexity,
+                                                                         **options),
+    'wifi_2d': lambda complexity, **options: WifiProblem(n_routers=complexity, signal_radius=35, **options),
+    'wifi_3d': lambda complexity, **options: WifiProblem3D(n_routers=complexity, signal_radius=45, **options),
+}
+
+
+PROBLEM_CLASSES = {
+    'pathfinding_2d': PathfindingProblem,
+    'pathfinding_3d': PathfindingProblem3D,
+    'wifi_2d': WifiProblem,
+    'wifi_3d': WifiProblem3D,
+}
+
+
+def build_problem(name, complexity=5, scene=None, **options):
+    # `options` are passed to the problem constructor (e.g. dtype). `scene` (a Scene or the path
+    # of a scene file) replaces the built-in geometry.
+    if name not in PROBLEMS:
+        raise ValueError(f"Unknown problem: {name} (expected one of {', '.join(PROBLEMS)})")
+    if scene is not None:
+        if not isinstance(scene, Scene):
+            scene = load_scene(scene)
+        return PROBLEM_CLASSES[name].from_scene(scene, int(complexity), **options)
+    return PROBLEMS[name](int(complexity), **options)
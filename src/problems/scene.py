@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.problems.geometry import UniformGrid, build_uniform_grid, sphere_boxes
+from src.problems.propagation import cuboid_boxes, rect_boxes
+
+# Scene files are JSON:
+#
+#     {
+#       "name": "Birou",
+#       "dimensions": 2,
+#       "size": [100, 100],                   # the floor plan spans [0, size] on every axis
+#       "start": [5, 5], "end": [95, 95],     # pathfinding endpoints
+#       "grid_resolution": 50,                # Wi-Fi coverage grid (points per axis)
+#       "signal_radius": 35,                  # optional, Wi-Fi
+#       "obstacles": [[30, 30, 10], ...],     # circles / spheres: center..., radius
+#       "walls": [[40, 0, 5, 60], ...],       # 2D: x, y, w, h  /  3D: x0, x1, y0, y1, z0, z1
+#       "rooms": [{"box": [0, 0, 40, 50], "wall_thickness": 1}]
+#     }
+#
+# Rooms are outlines (same layout as walls) compiled into one wall per side; in 3D the
+# side walls span the room's full height. Everything but "dimensions" and "size" is optional.
+#
+# Compiling packs the geometry into arrays (obstacles (K, dim + 1), wall boxes (W, 2, dim)),
+# bounding boxes and a uniform grid over the obstacles. The result is cached next to the
+# scene file as <name>.scene.npz and reused while the JSON is unchanged.
+
+SCENE_FORMAT_VERSION = 1
+
+
+def _room_walls(box, thickness, dim):
+    if dim == 2:
+        x, y, w, h = box
+        t = thickness
+        return [(x, y, w, t), (x, y + h - t, w, t), (x, y, t, h), (x + w - t, y, t, h)]
+    x0, x1, y0, y1, z0, z1 = box
+    t = thickness
+    return [(x0, x1, y0, y0 + t, z0, z1), (x0, x1, y1 - t, y1, z0, z1),
+            (x0, x0 + t, y0, y1, z0, z1), (x1 - t, x1, y0, y1, z0, z1)]
+
+
+class Scene:
+    def __init__(self, name, size, start=None, end=None, obstacles=None, walls=None, grid_resolution=None,
+                 signal_radius=None, obstacle_grid=None, digest=''):
+        self.name = name
+        self.size = np.asarray(size, dtype=float)
+        self.dim = len(self.size)
+        self.start = np.asarray(start if start is not None else np.zeros(self.dim), dtype=float)
+        self.end = np.asarray(end if end is not None else self.size, dtype=float)
+        self.obstacles = np.asarray(obstacles if obstacles is not None else [], dtype=float).reshape(-1, self.dim + 1)
+        self.walls = np.asarray(walls if walls is not None else [], dtype=float).reshape(-1, 2 * self.dim)
+        self.grid_resolution = grid_resolution
+        self.signal_radius = signal_radius
+        self.digest = digest
+
+        self.obstacle_boxes = sphere_boxes(self.obstacles[:, :self.dim], self.obstacles[:, self.dim])
+        self.wall_boxes = rect_boxes(self.walls) if self.dim == 2 else cuboid_boxes(self.walls)
+        self.obstacle_grid = obstacle_grid
+        if obstacle_grid is None:
+            self.obstacle_grid = build_uniform_grid(self.obstacle_boxes, np.zeros(self.dim), self.size)
+
+    def to_arrays(self):
+        grid = self.obstacle_grid
+        meta = {'version': SCENE_FORMAT_VERSION, 'name': self.name, 'digest': self.digest,
+                'grid_resolution': self.grid_resolution, 'signal_radius': self.signal_radius}
+        return {
+            'meta': np.array(json.dumps(meta)),
+            'size': self.size,
+            'start': self.start,
+            'end': self.end,
+            'obstacles': self.obstacles,
+            'walls': self.walls,
+            'grid_lower': grid.lower,
+            'grid_cell_size': grid.cell_size,
+            'grid_shape': np.array(grid.shape),
+            'grid_starts': grid.starts,
+            'grid_items': grid.items,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        meta = json.loads(str(arrays['meta']))
+        grid = UniformGrid(arrays['grid_lower'], arrays['grid_cell_size'], arrays['grid_shape'],
+                           arrays['grid_starts'], arrays['grid_items'])
+        return cls(meta['name'], arrays['size'], arrays['start'], arrays['end'], arrays['obstacles'],
+                   arrays['walls'], meta['grid_resolution'], meta['signal_radius'], grid, meta['digest'])
+
+
+def compile_scene(spec, digest=''):
+    if 'size' not in spec:
+        raise ValueError("scene needs a 'size'")
+    dim = int(spec.get('dimensions', len(spec['size'])))
+    if dim not in (2, 3) or len(spec['size']) != dim:
+        raise ValueError(f"scene 'size' must have {dim} values and dimensions must be 2 or 3")
+
+    walls = [tuple(w) for w in spec.get('walls', [])]
+    for room in spec.get('rooms', []):
+        walls.extend(_room_walls(room['box'], room.get('wall_thickness', 1.0), dim))
+    for wall in walls:
+        if len(wall) != 2 * dim:
+            raise ValueError(f"wall {wall} must have {2 * dim} values in a {dim}D scene")
+    obstacles = spec.get('obstacles', [])
+    for obstacle in obstacles:
+        if len(obstacle) != dim + 1:
+            raise ValueError(f"obstacle {obstacle} must have {dim + 1} values (center, radius)")
+
+    return Scene(spec.get('name', ''), spec['size'], spec.get('start'), spec.get('end'), obstacles, walls,
+                 spec.get('grid_resolution'), spec.get('signal_radius'), digest=digest)
+
+
+def scene_cache_path(path):
+    return os.path.splitext(path)[0] + '.scene.npz'
+
+
+def load_scene(path, cache=True):
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source + str(SCENE_FORMAT_VERSION).encode()).hexdigest()
+
+    cache_path = scene_cache_path(path)
+    if cache and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as arrays:
+                scene = Scene.from_arrays(arrays)
+            if scene.digest == digest:
+                return scene
+        except (OSError, ValueError, KeyError):
+            pass
+
+    scene = compile_scene(json.loads(source), digest)
+    if cache:
+        # Written to a temporary file first so a concurrent reader never sees a partial cache.
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **scene.to_arrays())
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return scene
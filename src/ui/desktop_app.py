@@ -1,31 +1,51 @@
 import tkinter as tk
 from tkinter import ttk
+import os
 import threading
+import queue
+import time
 import numpy as np
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
-import matplotlib.animation as animation
 import matplotlib.patches as patches
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 
 try:
+    from src.core.batch import make_grid, run_batch, aggregate
+    from src.core.instrumentation import Profiler
     from src.core.pso_algorithm import PSO
-    from src.problems.problem_pathfinding import PathfindingProblem
-    from src.problems.problem_pathfinding_3d import PathfindingProblem3D
-    from src.problems.problem_wifi import WifiProblem
-    from src.problems.problem_wifi_3d import WifiProblem3D
+    from src.core.recorder import TrajectoryRecorder
+    from src.problems.coverage import signal_field
+    from src.problems.registry import build_problem
 except ImportError:
-    import sys, os
+    import sys
 
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
+    from src.core.batch import make_grid, run_batch, aggregate
+    from src.core.instrumentation import Profiler
     from src.core.pso_algorithm import PSO
-    from src.problems.problem_pathfinding import PathfindingProblem
-    from src.problems.problem_pathfinding_3d import PathfindingProblem3D
-    from src.problems.problem_wifi import WifiProblem
-    from src.problems.problem_wifi_3d import WifiProblem3D
+    from src.core.recorder import TrajectoryRecorder
+    from src.problems.coverage import signal_field
+    from src.problems.registry import build_problem
+
+PROBLEM_KEYS = {
+    "Pathfinding 2D": 'pathfinding_2d',
+    "Pathfinding 3D": 'pathfinding_3d',
+    "Wi-Fi 2D": 'wifi_2d',
+    "Wi-Fi 3D": 'wifi_3d',
+}
+SCENES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'scenes'))
+DEFAULT_SCENE = "Implicită"
+COMPARISON_SEEDS = 10
+LIVE_TARGET_FPS = 30
+LIVE_MIN_IDLE_MS = 5
+PATHS_3D_MAX = 20
+HEATMAP_RESOLUTION = 300
 
 C = {
     "bg_main": "#2b2b2b",
@@ -38,6 +58,47 @@ C = {
 }
 
 
+class LiveRenderer:
+    # Draws the animated artists over a cached copy of the static layers (styled axes,
+    # obstacles, walls), so a frame only costs the swarm itself. The background is recaptured
+    # on every full draw (resize, 3D rotation).
+    def __init__(self, canvas, fig, artists, update):
+        self.canvas = canvas
+        self.fig = fig
+        self.artists = artists
+        self.update = update
+        self.background = None
+        self.render_ms = 0.0
+        for artist in artists:
+            artist.set_animated(True)
+        self.cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            if hasattr(artist, 'do_3d_projection'):
+                artist.do_3d_projection()
+            self.fig.draw_artist(artist)
+
+    def render(self, positions):
+        start = time.perf_counter()
+        self.update(positions)
+        if self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        # Smoothed cost of a frame, used to pace the polling.
+        self.render_ms = 0.8 * self.render_ms + 0.2 * (time.perf_counter() - start) * 1000
+
+    def close(self):
+        self.canvas.mpl_disconnect(self.cid)
+
+
 class PSOInterface:
     def __init__(self, root):
         self.root = root
@@ -47,14 +108,15 @@ class PSOInterface:
 
         self.problem_mode = tk.StringVar(value="Pathfinding 2D")
         self.topology_mode = tk.StringVar(value="global")
+        self.scene_mode = tk.StringVar(value=DEFAULT_SCENE)
 
         self.var_part = tk.DoubleVar(value=40)
         self.var_iter = tk.DoubleVar(value=100)
         self.var_complex = tk.DoubleVar(value=5)
 
         self.is_running = False
-        self.current_anim = None
-        self.history = []
+        self.live_queue = queue.Queue()
+        self.live_renderer = None
         self.best_pos = None
         self.problem_instance = None
         self.comparison_results = {}
@@ -99,9 +161,14 @@ class PSOInterface:
 
         self._add_label(sidebar, "Topologie:")
         topo_cb = ttk.Combobox(sidebar, textvariable=self.topology_mode, state="readonly")
-        topo_cb['values'] = ("Global", "Social", "Geographic")
+        topo_cb['values'] = ("Global", "Social", "Geographic", "Von Neumann", "Random", "Star")
         topo_cb.pack(fill=tk.X, padx=15, pady=5)
 
+        self._add_label(sidebar, "Geometrie:")
+        scene_cb = ttk.Combobox(sidebar, textvariable=self.scene_mode, state="readonly")
+        scene_cb['values'] = (DEFAULT_SCENE,) + self._scene_names()
+        scene_cb.pack(fill=tk.X, padx=15, pady=5)
+
         tk.Frame(sidebar, bg="#555", height=2).pack(fill=tk.X, padx=15, pady=20)
 
         self.lbl_part = self._add_label(sidebar, f"Particule: {int(self.var_part.get())}")
@@ -147,6 +214,17 @@ class PSOInterface:
         toolbar.update()
         toolbar.pack(side=tk.BOTTOM, fill=tk.X)
 
+    def _scene_names(self):
+        if not os.path.isdir(SCENES_DIR):
+            return ()
+        return tuple(sorted(os.path.splitext(f)[0] for f in os.listdir(SCENES_DIR) if f.endswith('.json')))
+
+    def _scene_path(self):
+        name = self.scene_mode.get()
+        if name == DEFAULT_SCENE:
+            return None
+        return os.path.join(SCENES_DIR, name + '.json')
+
     def _add_label(self, parent, text):
         lbl = tk.Label(parent, text=text, bg=C["bg_side"], fg="white", font=("Helvetica", 10), anchor="w")
         lbl.pack(fill=tk.X, padx=15, pady=(10, 0))
@@ -179,12 +257,8 @@ class PSOInterface:
 
     def start_thread(self):
         if self.is_running: return
-        try:
-            if self.current_anim and getattr(self.current_anim, 'event_source', None):
-                self.current_anim.event_source.stop()
-        except:
-            pass
-        self.current_anim = None
+        self._close_live_renderer()
+        self.live_queue = queue.Queue()
 
         self.fig.clf()
         self.canvas.draw()
@@ -199,9 +273,15 @@ class PSOInterface:
         if "COMPARATIV" in mode:
             threading.Thread(target=self.run_comparison_logic, daemon=True).start()
         else:
-            threading.Thread(target=self.run_simulation_logic, daemon=True).start()
+            threading.Thread(target=self.run_simulation_logic, args=(self.live_queue,), daemon=True).start()
+            self.root.after(LIVE_MIN_IDLE_MS, self._poll_live)
+
+    def run_simulation_logic(self, live_queue):
+        # Runs on a worker thread: everything for the UI, log lines included, goes through the
+        # queue and is applied by _poll_live on the Tk thread.
+        def log(msg):
+            live_queue.put(('log', msg))
 
-    def run_simulation_logic(self):
         try:
             mode = self.problem_mode.get()
             topo = self.topology_mode.get()
@@ -209,51 +289,98 @@ class PSOInterface:
             n_part = int(self.var_part.get())
             n_iter = int(self.var_iter.get())
             comp = int(self.var_complex.get())
-            self.log(f"Simulare: {mode}")
+            log(f"Simulare: {mode}")
 
-            if mode == "Pathfinding 2D":
-                self.problem_instance = PathfindingProblem((5, 5), (95, 95), comp)
-            elif mode == "Pathfinding 3D":
-                self.problem_instance = PathfindingProblem3D((5, 5, 5), (95, 95, 95), comp)
-            elif mode == "Wi-Fi 2D":
-                self.problem_instance = WifiProblem(n_routers=comp, signal_radius=35)
-            elif mode == "Wi-Fi 3D":
-                self.problem_instance = WifiProblem3D(n_routers=comp, signal_radius=45)
+            scene = self._scene_path()
+            if scene is not None:
+                log(f"Geometrie: {self.scene_mode.get()}")
+            self.problem_instance = build_problem(PROBLEM_KEYS[mode], comp, scene=scene)
 
             pso = PSO(self.problem_instance.fitness_function,
                       self.problem_instance.get_bounds(),
                       n_part,
                       n_iter,
                       topology=topo,
-                      neighbor_size=5)
-
-            best_pos, best_val, history, _ = pso.optimize()
-            self.history = history;
-            self.best_pos = best_pos
-
-            self.log(f"Cost Final: {best_val:.2f}")
-            self.root.after(0, lambda: self.start_animation(mode))
+                      neighbor_size=5,
+                      recorder=TrajectoryRecorder('off'),
+                      profiler=Profiler())
+
+            live_queue.put(('start', (mode, n_part)))
+            for snapshot in pso.steps(positions=True):
+                # The snapshot views the live swarm arrays; hand the UI thread its own copy.
+                snapshot.positions = snapshot.positions.copy()
+                live_queue.put(('frame', snapshot))
+
+            result = pso.result()
+            self.best_pos = result.best_position
+
+            log(f"Cost Final: {result.best_value:.2f}")
+            log(f"Iterații: {result.iterations} ({result.stop_reason})")
+            log("Profil (timp pe faze):")
+            for line in result.profile.lines():
+                log(line)
+            live_queue.put(('done', result))
         except Exception as e:
-            self.root.after(0, lambda: self.show_error(str(e)))
+            live_queue.put(('error', str(e)))
+
+    def _poll_live(self):
+        latest = None
+        while True:
+            try:
+                kind, payload = self.live_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'log':
+                self.log(payload)
+            elif kind == 'start':
+                self.start_animation(*payload)
+            elif kind == 'frame':
+                latest = payload
+            elif kind == 'done':
+                self._render_live(latest)
+                self.finish_sequence()
+                return
+            elif kind == 'error':
+                self.show_error(payload)
+                return
+
+        # Only the newest snapshot is drawn; older ones queued since the last poll are dropped.
+        # The next poll is timed so that polling plus drawing keeps to LIVE_TARGET_FPS: when
+        # frames get expensive (large swarms) more of them are dropped instead of falling behind.
+        self._render_live(latest)
+        render_ms = self.live_renderer.render_ms if self.live_renderer is not None else 0.0
+        self.root.after(max(LIVE_MIN_IDLE_MS, int(1000 / LIVE_TARGET_FPS - render_ms)), self._poll_live)
+
+    def _render_live(self, snapshot):
+        if snapshot is None or self.live_renderer is None:
+            return
+        self.live_renderer.render(snapshot.positions)
 
     def run_comparison_logic(self):
         try:
-            self.log("Studiu Comparativ...")
-            problem = PathfindingProblem((5, 5), (95, 95), int(self.var_complex.get()))
-            topologies = [('global', 0), ('social', 5), ('geographic', 5)]
+            self.root.after(0, self.log, "Studiu Comparativ...")
+            grid = make_grid(['pathfinding_2d'], ['global', 'social', 'geographic'],
+                             [int(self.var_part.get())], [int(self.var_iter.get())], range(COMPARISON_SEEDS),
+                             complexity=int(self.var_complex.get()))
+            self.root.after(0, self.log, f"Rulare: {len(grid)} simulări ({COMPARISON_SEEDS} seed-uri / topologie)...")
             self.comparison_results = {}
-            for top, size in topologies:
-                self.log(f"Rulare: {top}...")
-                pso = PSO(problem.fitness_function, problem.get_bounds(), int(self.var_part.get()),
-                          int(self.var_iter.get()), topology=top, neighbor_size=size)
-                _, best, _, hist = pso.optimize()
-                self.comparison_results[top] = hist
-                self.log(f"-> {top}: {best:.2f}")
+            for stats in aggregate(run_batch(grid)):
+                top = stats['topology']
+                self.comparison_results[top] = stats
+                self.root.after(0, self.log, f"-> {top}: {stats['final_median']:.2f} (mediană), {stats['final_best']:.2f} (min)")
             self.root.after(0, self.draw_comparison_chart)
         except Exception as e:
             self.root.after(0, lambda: self.show_error(str(e)))
 
+    def _close_live_renderer(self):
+        # Disconnects the renderer's draw_event callback before its artists go away.
+        if self.live_renderer is not None:
+            self.live_renderer.close()
+        self.live_renderer = None
+
     def show_error(self, msg):
+        self._close_live_renderer()
         self.log(f"Eroare: {msg}")
         self.is_running = False
         self.btn_start.config(state="normal", text="EROARE")
@@ -280,21 +407,24 @@ class PSOInterface:
             ax.zaxis.set_pane_color((0.2, 0.2, 0.2, 1.0))
             ax.grid(True, linestyle=':', alpha=0.4, color="#777")
 
-    def start_animation(self, mode):
+    def start_animation(self, mode, num_particles):
         is_3d = "3D" in mode
         self.ax = self.fig.add_subplot(111, projection='3d' if is_3d else None)
 
         if mode == "Pathfinding 2D":
-            self._anim_path_2d()
+            artists, update = self._anim_path_2d(num_particles)
         elif mode == "Pathfinding 3D":
-            self._anim_path_3d()
+            artists, update = self._anim_path_3d(num_particles)
         elif mode == "Wi-Fi 2D":
-            self._anim_wifi_2d()
+            artists, update = self._anim_wifi_2d(num_particles)
         elif mode == "Wi-Fi 3D":
-            self._anim_wifi_3d()
+            artists, update = self._anim_wifi_3d(num_particles)
+        self._close_live_renderer()
+        self.live_renderer = LiveRenderer(self.canvas, self.fig, artists, update)
         self.canvas.draw()
 
     def finish_sequence(self):
+        self._close_live_renderer()
         self.is_running = False
         self.btn_start.config(state="normal", text="START SIMULARE")
         self.log("Finalizat.")
@@ -323,89 +453,90 @@ class PSOInterface:
         self.ax.set_ylabel("Cost")
 
         styles = {'global': ('#ff5252', '-'), 'social': ('#69f0ae', '--'), 'geographic': ('#448aff', '-.')}
-        for top, data in self.comparison_results.items():
+        for top, stats in self.comparison_results.items():
             color, style = styles.get(top, ('white', '-'))
-            self.ax.plot(data, label=top.capitalize(), color=color, linestyle=style, lw=2)
+            x = np.arange(len(stats['median']))
+            self.ax.fill_between(x, stats['p10'], stats['p90'], color=color, alpha=0.08, lw=0)
+            self.ax.fill_between(x, stats['p25'], stats['p75'], color=color, alpha=0.2, lw=0)
+            self.ax.plot(x, stats['median'], label=f"{top.capitalize()} (mediană)", color=color, linestyle=style,
+                         lw=2)
         self.ax.legend(facecolor="#444", labelcolor="white", edgecolor="#555")
         self.canvas.draw()
 
-    def _anim_path_2d(self):
+    def _set_limits(self, prob):
+        # The problem's extent is the search range of the first waypoint / router.
+        bounds = prob.get_bounds()
+        self.ax.set_xlim(*bounds[0])
+        self.ax.set_ylim(*bounds[1])
+        if hasattr(self.ax, 'set_zlim'):
+            self.ax.set_zlim(*bounds[2])
+
+    def _anim_path_2d(self, num_particles):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Simulare Pathfinding 2D")
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100)
+        self._set_limits(prob)
         for (ox, oy, r) in prob.obstacles: self.ax.add_patch(patches.Circle((ox, oy), r, color='#555', alpha=0.8))
         self.ax.plot(*prob.start, 'gs', ms=10, zorder=5);
         self.ax.plot(*prob.end, 'rx', ms=10, zorder=5)
-        lines = [self.ax.plot([], [], color=C["accent"], alpha=0.3)[0] for _ in range(len(self.history[0]))]
+        # All paths share one collection, refreshed from a preallocated (N, waypoints + 2, 2)
+        # array whose start and end columns are filled once.
+        paths = np.empty((num_particles, prob.num_waypoints + 2, 2))
+        paths[:, 0] = prob.start
+        paths[:, -1] = prob.end
+        lines = LineCollection([], colors=C["accent"], alpha=0.3)
+        self.ax.add_collection(lines)
 
-        def update(frame):
-            if frame == len(self.history) - 1: self.root.after(100, self.finish_sequence)
-            for i, p in enumerate(self.history[frame]):
-                full = np.vstack([prob.start, p.reshape((prob.num_waypoints, 2)), prob.end])
-                lines[i].set_data(full[:, 0], full[:, 1])
+        def update(positions):
+            paths[:, 1:-1] = positions.reshape((len(paths), prob.num_waypoints, 2))
+            lines.set_segments(paths)
 
-        self.current_anim = animation.FuncAnimation(self.fig, update, frames=len(self.history), interval=30,
-                                                    repeat=False)
+        return [lines], update
 
-    def _anim_path_3d(self):
+    def _anim_path_3d(self, num_particles):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Simulare Pathfinding 3D", True)
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100);
-        self.ax.set_zlim(0, 100)
+        self._set_limits(prob)
         for (ox, oy, oz, r) in prob.obstacles: self.ax.scatter(ox, oy, oz, s=r * 20, c='#555', alpha=0.3)
-        lines = [self.ax.plot([], [], [], color=C["accent"], alpha=0.3)[0] for _ in
-                 range(min(20, len(self.history[0])))]
+        # Starts as straight start -> end paths (add_collection3d needs points to autoscale).
+        paths = np.empty((min(PATHS_3D_MAX, num_particles), prob.num_waypoints + 2, 3))
+        paths[:] = np.linspace(prob.start, prob.end, prob.num_waypoints + 2)
+        lines = Line3DCollection(paths, colors=C["accent"], alpha=0.3)
+        self.ax.add_collection3d(lines)
 
-        def update(frame):
-            if frame == len(self.history) - 1: self.root.after(100, self.finish_sequence)
-            for i, l in enumerate(lines):
-                if i >= len(self.history[frame]): break
-                full = np.vstack([prob.start, self.history[frame][i].reshape((prob.num_waypoints, 3)), prob.end])
-                l.set_data(full[:, 0], full[:, 1]);
-                l.set_3d_properties(full[:, 2])
+        def update(positions):
+            paths[:, 1:-1] = positions[:len(paths)].reshape((len(paths), prob.num_waypoints, 3))
+            lines.set_segments(paths)
 
-        self.current_anim = animation.FuncAnimation(self.fig, update, frames=len(self.history), interval=60,
-                                                    repeat=False)
+        return [lines], update
 
-    def _anim_wifi_2d(self):
+    def _anim_wifi_2d(self, num_particles):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Simulare Wi-Fi")
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100)
+        self._set_limits(prob)
         for (wx, wy, w, h) in prob.walls: self.ax.add_patch(patches.Rectangle((wx, wy), w, h, facecolor='#666'))
         scat = self.ax.scatter([], [], c=C["accent"])
 
-        def update(frame):
-            if frame == len(self.history) - 1: self.root.after(100, self.finish_sequence)
-            pts = [p.reshape((prob.n_routers, 2)) for p in self.history[frame]]
-            scat.set_offsets(np.vstack(pts))
+        def update(positions):
+            scat.set_offsets(positions.reshape((-1, 2)))
 
-        self.current_anim = animation.FuncAnimation(self.fig, update, frames=len(self.history), interval=50,
-                                                    repeat=False)
+        return [scat], update
 
-    def _anim_wifi_3d(self):
+    def _anim_wifi_3d(self, num_particles):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Simulare Wi-Fi 3D", True)
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100);
-        self.ax.set_zlim(0, 100)
+        self._set_limits(prob)
         scat = self.ax.scatter([], [], [], c=C["accent"])
 
-        def update(frame):
-            if frame == len(self.history) - 1: self.root.after(100, self.finish_sequence)
-            all_r = np.vstack([p.reshape((prob.n_routers, 3)) for p in self.history[frame]])
+        def update(positions):
+            all_r = positions.reshape((-1, 3))
             scat._offsets3d = (all_r[:, 0], all_r[:, 1], all_r[:, 2])
 
-        self.current_anim = animation.FuncAnimation(self.fig, update, frames=len(self.history), interval=60,
-                                                    repeat=False)
+        return [scat], update
 
     def _draw_final_path_2d(self):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Rezultat Final")
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100)
+        self._set_limits(prob)
         for (ox, oy, r) in prob.obstacles: self.ax.add_patch(patches.Circle((ox, oy), r, color='#555', alpha=0.9))
         full = np.vstack([prob.start, self.best_pos.reshape((prob.num_waypoints, 2)), prob.end])
         self.ax.plot(full[:, 0], full[:, 1], color=C["accent"], lw=3, label="Traseu Optim")
@@ -428,18 +559,11 @@ class PSOInterface:
     def _draw_final_wifi_2d(self):
         prob = self.problem_instance;
         self._style_axes(self.ax, "Heatmap Final")
-        self.ax.set_xlim(0, 100);
-        self.ax.set_ylim(0, 100)
-        x = np.linspace(0, 100, 100);
-        y = np.linspace(0, 100, 100);
-        X, Y = np.meshgrid(x, y);
-        Z = np.zeros_like(X)
+        self._set_limits(prob)
         routers = self.best_pos.reshape((prob.n_routers, 2))
-        for i in range(100):
-            for j in range(100):
-                md = min([np.linalg.norm([X[i, j] - r[0], Y[i, j] - r[1]]) for r in routers])
-                if md < prob.radius: Z[i, j] = 1 - (md / prob.radius)
-        self.ax.imshow(Z, extent=(0, 100, 0, 100), origin='lower', cmap='viridis', alpha=0.8)
+        Z = signal_field(routers, prob.radius, (0, prob.width, 0, prob.height), HEATMAP_RESOLUTION,
+                         prob.wall_boxes, prob.wall_loss_db, prob.path_loss_exponent)
+        self.ax.imshow(Z, extent=(0, prob.width, 0, prob.height), origin='lower', cmap='viridis', alpha=0.8)
         for (wx, wy, w, h) in prob.walls: self.ax.add_patch(patches.Rectangle((wx, wy), w, h, facecolor='#444'))
         for r in routers:
             self.ax.scatter(*r, c='red', marker='^', s=100, edgecolors='white')